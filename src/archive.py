@@ -0,0 +1,132 @@
+"""Compressed archival of old scene increments.
+
+The newest versions of every descriptor/task/ext are left alone, older
+ones are streamed into gzip files in the folder's archive sub folder
+and can be streamed back out with restore_version.
+"""
+import concurrent.futures
+import gzip
+import logging
+import os
+import shutil
+
+import scene_history
+import scene_name
+from scenefile import SceneFile
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_FOLDER = "archive"
+ARCHIVE_EXT = ".gz"
+CHUNK_SIZE = 1024 * 1024
+
+
+def archive_path(scene_file):
+    """Returns where a scene version is archived to"""
+    return os.path.join(str(scene_file.folder_path), ARCHIVE_FOLDER,
+                        scene_file.filename + ARCHIVE_EXT)
+
+
+def _check_keep(keep):
+    # Archiving every version would restart the folder at v001, whose
+    # next archive would then collide with the old v001
+    if keep < 1:
+        raise ValueError("At least one version has to be kept, got "
+                         "keep={}".format(keep))
+
+
+def plan_archive(folder, keep=3):
+    """Returns the SceneFiles in folder older than the newest keep"""
+    _check_keep(keep)
+    names = [entry.path for entry in os.scandir(str(folder))
+             if entry.is_file()]
+    # Manifests of stored scenes parse as the scene they stand in for,
+    # their chunks are deduplicated already so they aren't archived
+    scenes = [name for name in names
+              if not name.endswith(scene_name.STORED_SUFFIX)]
+    if len(scenes) < len(names):
+        log.info("Skipped %d stored scene manifests in %s",
+                 len(names) - len(scenes), folder)
+    versions = {}
+    for scene_file in SceneFile.from_many(scenes):
+        if not scene_file.path.is_file():
+            continue
+        key = (scene_file.descriptor, scene_file.task, scene_file.ext)
+        versions.setdefault(key, []).append(scene_file)
+    old = []
+    for scene_files in versions.values():
+        scene_files.sort(key=lambda scene_file: scene_file.ver)
+        old.extend(scene_files[:-keep])
+    return old
+
+
+def _stream(source, target, compress, compresslevel=6):
+    """Streams source into target through gzip with bounded memory
+
+    Raises FileExistsError rather than replace an existing target.
+    """
+    if os.path.exists(target):
+        raise FileExistsError("'{}' already exists".format(target))
+    folder = os.path.dirname(target)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    partial = target + ".part"
+    with open(source, "rb") as source_file:
+        if compress:
+            target_file = gzip.open(partial, "wb", compresslevel)
+        else:
+            target_file = open(partial, "wb")
+            source_file = gzip.GzipFile(fileobj=source_file, mode="rb")
+        with target_file:
+            shutil.copyfileobj(source_file, target_file, CHUNK_SIZE)
+    shutil.copystat(source, partial)
+    if os.path.exists(target):
+        os.remove(partial)
+        raise FileExistsError("'{}' already exists".format(target))
+    os.replace(partial, target)
+    return target
+
+
+def archive_folder(folder, keep=3, compresslevel=6):
+    """Archives the old versions in one folder, returns archive paths
+
+    A version whose archive already exists is left in place.
+    """
+    _check_keep(keep)
+    history = scene_history.SceneHistory(folder)
+    archived = []
+    for scene_file in plan_archive(folder, keep):
+        source = str(scene_file.path)
+        try:
+            archived.append(_stream(source, archive_path(scene_file), True,
+                                    compresslevel))
+        except FileExistsError as error:
+            log.warning("Not archiving %s: %s", source, error)
+            continue
+        os.remove(source)
+        history.forget(scene_file.filename)
+        log.info("Archived %s", source)
+    return archived
+
+
+def archive_folders(folders, keep=3, workers=None):
+    """Archives many folders in parallel, returns {folder: archives}"""
+    folders = list(folders)
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        results = executor.map(archive_folder, folders,
+                               [keep] * len(folders))
+        return dict(zip(folders, results))
+
+
+def restore_version(folder, descriptor, task, ver, ext=".ma", target=None):
+    """Streams an archived version back out, to its old path by default
+
+    Raises FileExistsError when the target is already there.
+    """
+    scene_file = SceneFile(os.path.join(
+        str(folder), "{}_{}_v{:03d}{}".format(descriptor, task, ver, ext)))
+    target = str(target or scene_file.path)
+    _stream(archive_path(scene_file), target, False)
+    if target == str(scene_file.path):
+        scene_history.SceneHistory(folder).record(scene_file.filename)
+    return target
@@ -0,0 +1,137 @@
+"""Batch scattering of many sources over many destination meshes.
+
+Every job's destination is exported to plain vertex buffers up front,
+the placements are computed in a process pool and only the final bulk
+application runs in the host.
+"""
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+import geometry
+import maya_host
+import placement
+import scatter_job
+import weight_maps
+
+log = logging.getLogger(__name__)
+
+
+def export_source(source):
+    """Returns a plain, picklable copy of a geometry source's buffers"""
+    return geometry.GeometrySource(source.positions, source.normals,
+                                   list(source.meshes), source.mesh_ids,
+                                   source.vertex_ids, source.triangles,
+                                   source.colors)
+
+
+class BatchScatterJob(object):
+    """One scatter source over one destination with its own settings
+
+    placement and seconds are filled in by compute_batch, seconds being
+    how long the worker took to compute the placement.
+    """
+
+    def __init__(self, scatter_name, source, settings):
+        self.scatter_name = scatter_name
+        self.source = export_source(source)
+        self.settings = settings
+        self.placement = None
+        self.seconds = 0.0
+
+    @classmethod
+    def from_maya(cls, scatter_name, destination, settings, cmds=None):
+        """Exports the vertices of a Maya destination into a job"""
+        cmds = cmds or maya_host.maya_cmds()
+        vertices = cmds.polyListComponentConversion(destination,
+                                                    toVertex=True)
+        color_set = None
+        weight_map = settings.weight_map
+        if weight_map is not None and weight_map.kind == weight_maps.COLOR:
+            color_set = ""
+        return cls(scatter_name,
+                   geometry.MayaMeshSource(vertices, color_set=color_set),
+                   settings)
+
+    def __repr__(self):
+        return "BatchScatterJob({!r}, {})".format(
+            self.scatter_name, "|".join(self.source.meshes))
+
+
+def mayapy_executable():
+    """Returns the mayapy of a running Maya GUI, or None
+
+    Pool workers are started with sys.executable, which inside the GUI
+    is Maya itself. Outside Maya, or in mayapy, None is returned and
+    workers start as usual.
+    """
+    folder, name = os.path.split(sys.executable)
+    if os.path.splitext(name)[0].lower() != "maya":
+        return None
+    mayapy = "mayapy.exe" if sys.platform == "win32" else "mayapy"
+    # Next to maya.exe on Windows and maya.bin on Linux, in the bundle's
+    # bin folder on macOS
+    for candidate in (os.path.join(folder, mayapy),
+                      os.path.join(folder, os.pardir, "bin", mayapy)):
+        if os.path.isfile(candidate):
+            return os.path.normpath(candidate)
+    return None
+
+
+def _compute(source, settings):
+    start = time.perf_counter()
+    result = placement.compute_placement(source, settings)
+    return result, time.perf_counter() - start
+
+
+def compute_batch(jobs, workers=None):
+    """Computes every job's placement, in a process pool unless workers is 1
+
+    The biggest destinations are submitted first so that a large job
+    doesn't start last and leave the other workers idle. Run from the
+    Maya GUI, workers are started with its mayapy.
+    """
+    jobs = list(jobs)
+    start = time.perf_counter()
+    if workers == 1:
+        for job in jobs:
+            job.placement, job.seconds = _compute(job.source, job.settings)
+    else:
+        ordered = sorted(jobs, key=lambda job: len(job.source), reverse=True)
+        mayapy = mayapy_executable()
+        if mayapy:
+            multiprocessing.set_executable(mayapy)
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            futures = [(job, executor.submit(_compute, job.source,
+                                             job.settings))
+                       for job in ordered]
+            for job, future in futures:
+                job.placement, job.seconds = future.result()
+    elapsed = time.perf_counter() - start
+    for job in jobs:
+        log.info("Computed %d instances of %r in %.3fs", len(job.placement),
+                 job, job.seconds)
+    log.info("Computed %d scatter jobs in %.2fs", len(jobs), elapsed)
+    return jobs
+
+
+def apply_batch(jobs, output_type, chunk_size=1000, cmds=None):
+    """Writes every computed job into Maya inside one undo chunk
+
+    Each job gets its own instance group, like a single scatter does.
+    Returns the list of created nodes of every job.
+    """
+    cmds = cmds or maya_host.maya_cmds()
+    created = []
+    with scatter_job.undo_chunk("batch scatter", cmds):
+        for job in jobs:
+            instance_group = cmds.group(
+                empty=True, name=job.scatter_name + "_instance_grp#")
+            created.append(scatter_job.ScatterJob(
+                output_type(cmds), job.scatter_name, instance_group,
+                job.placement.transforms, chunk_size=chunk_size,
+                cmds=cmds).run())
+    return created
@@ -0,0 +1,449 @@
+"""Benchmarks for the Maya independent parts of the tools.
+
+Run with ``python benchmarks.py [name ...]`` from the src folder, for
+example ``python benchmarks.py import_time`` to check that the core
+modules still import without Maya or Qt.
+"""
+import fnmatch
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+import batch_scatter
+import dedup_store
+import geometry
+import instrument
+import placement
+import point_cache
+import poisson
+import sampling
+import smartsave
+import scatter_engine
+import scenefile
+import version_index
+import weight_maps
+
+
+def timed(func, *args, **kwargs):
+    """Returns how many seconds func took and its result"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench_scatter_engine(counts=(1000, 100000, 1000000)):
+    """Times compute_transforms and matrices() over random points"""
+    rng = np.random.default_rng(0)
+    for count in counts:
+        positions = rng.uniform(-100.0, 100.0, (count, 3))
+        seconds, transforms = timed(scatter_engine.compute_transforms,
+                                    positions, (360, 360, 360),
+                                    (1, 1, 1), (3, 3, 3), seed=1)
+        matrix_seconds, _ = timed(transforms.matrices)
+        print("scatter_engine {:>9} points: transforms {:.4f}s, "
+              "matrices {:.4f}s".format(count, seconds, matrix_seconds))
+
+
+def legacy_percentage_to_spread_onto(vertex_names, percent):
+    """The original list.pop based ScatterToolUI vertex removal"""
+    percent_to_delete = 100 - percent
+    num_in_list = len(vertex_names)
+    num_to_delete = int((float(percent_to_delete) / 100) * num_in_list)
+    while num_to_delete != 0:
+        random_value = int(random.uniform(0, (len(vertex_names) - 1)))
+        vertex_names.pop(random_value)
+        num_to_delete = num_to_delete - 1
+    return vertex_names
+
+
+def bench_sampling(counts=(10000, 100000, 1000000), percent=50):
+    """Compares the legacy vertex removal against the sampling module"""
+    for count in counts:
+        names = ["pCube1.vtx[{}]".format(index) for index in range(count)]
+        keep = sampling.keep_count(count, percent)
+        legacy_seconds, _ = timed(legacy_percentage_to_spread_onto,
+                                  list(names), percent)
+        index_seconds, _ = timed(sampling.sample_indices, count, keep,
+                                 seed=1)
+        stream_seconds, _ = timed(sampling.reservoir_sample,
+                                  iter(range(count)), keep, seed=1)
+        sequence_seconds, _ = timed(sampling.reservoir_sample, names, keep,
+                                    seed=1)
+        print("sampling {:>9} vertices: legacy {:.4f}s, indices {:.4f}s, "
+              "reservoir stream {:.4f}s, list {:.4f}s".format(
+                  count, legacy_seconds, index_seconds, stream_seconds,
+                  sequence_seconds))
+
+
+def bench_poisson(counts=(10000, 100000, 300000), min_distance=1.0):
+    """Times poisson_disk_filter on points spread over a 100x100 plane"""
+    rng = np.random.default_rng(0)
+    for count in counts:
+        positions = rng.uniform(0.0, 100.0, (count, 3))
+        positions[:, 1] = 0.0
+        seconds, kept = timed(poisson.poisson_disk_filter, positions,
+                              min_distance, seed=1)
+        print("poisson {:>9} candidates: {:.4f}s, kept {}".format(
+            count, seconds, len(kept)))
+
+
+def bench_batch_scatter(jobs=8, rows=200, workers=(1, None)):
+    """Times compute_batch serially and over every core"""
+    settings = placement.ScatterSettings(
+        mode=placement.SURFACE_MODE, surface_points=20000,
+        min_distance=0.5, rotate_max=(0, 360, 0), align=True)
+    source = geometry.MockMeshSource.plane(rows, rows)
+    for worker_count in workers:
+        batch = [batch_scatter.BatchScatterJob("scatter{}".format(index),
+                                               source, settings)
+                 for index in range(jobs)]
+        seconds, _ = timed(batch_scatter.compute_batch, batch, worker_count)
+        print("batch_scatter {} jobs, {} workers: {:.3f}s, "
+              "{:.3f}s of job time".format(
+                  jobs, worker_count or os.cpu_count(), seconds,
+                  sum(job.seconds for job in batch)))
+
+
+def bench_weighted_sampling(count=1000000, keep=(1.0, 0.01)):
+    """Times a weighted vertex scatter as the mask rejects more"""
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-100.0, 100.0, (count, 3))
+    source = geometry.MockMeshSource(positions)
+    for fraction in keep:
+        weight_map = weight_maps.WeightMap(weight_maps.HEIGHT,
+                                           low=100.0 - 200.0 * fraction,
+                                           high=100.0)
+        settings = placement.ScatterSettings(percent=50,
+                                             weight_map=weight_map)
+        seconds, (kept, _, _, _) = timed(placement.scatter_points, source,
+                                      settings)
+        print("weighted_sampling {} vertices, {:.0%} unmasked: {:.4f}s, "
+              "kept {}".format(count, fraction, seconds, len(kept)))
+
+
+def bench_preview(points=100000, budget=0.1, side=1000):
+    """Times incremental preview updates of a surface scatter
+
+    The destination is a side x side plane, a million vertices by
+    default. Returns the updates that reused the sampled points but
+    still went over budget seconds.
+    """
+    source = geometry.MockMeshSource.plane(side, side)
+    settings = placement.ScatterSettings(mode=placement.SURFACE_MODE,
+                                         surface_points=points, align=True)
+    placer = placement.IncrementalPlacement()
+    failures = []
+    changes = (("first update", {}),
+               ("rotate change", {"rotate_max": (0, 360, 0)}),
+               ("scale change", {"scale_min": (1, 1, 1),
+                                 "scale_max": (2, 2, 2)}),
+               ("unchanged", {}),
+               ("point count change", {"surface_points": points // 2}))
+    for label, values in changes:
+        for name, value in values.items():
+            setattr(settings, name, value)
+        seconds, _ = timed(placer.update, source, settings)
+        print("preview {} points, {:<18}: {:.4f}s, recomputed {}".format(
+            points, label, seconds, ", ".join(placer.recomputed) or "-"))
+        if "points" not in placer.recomputed and seconds > budget:
+            failures.append("preview " + label)
+    return failures
+
+
+def bench_instrument(calls=1000000):
+    """Times a hooked call with instrumentation disabled and enabled"""
+    @instrument.timed("bench.noop")
+    def hooked():
+        pass
+
+    def plain():
+        pass
+
+    for label, func in (("plain call", plain), ("disabled", hooked)):
+        seconds, _ = timed(lambda: [func() for _ in range(calls)])
+        print("instrument {:<10}: {:.0f}ns per call".format(
+            label, seconds / calls * 1e9))
+    instrument.enable()
+    try:
+        seconds, _ = timed(lambda: [hooked() for _ in range(calls)])
+    finally:
+        instrument.disable()
+    print("instrument {:<10}: {:.0f}ns per call".format(
+        "enabled", seconds / calls * 1e9))
+
+
+def bench_point_cache(counts=(100000, 2000000), budget=0.01):
+    """Times writing point caches, opening them and reading a range
+
+    Compares against loading the same transforms from an .npz file and
+    returns the caches whose open and range read went over budget.
+    """
+    failures = []
+    folder = tempfile.mkdtemp()
+    try:
+        for count in counts:
+            rng = np.random.default_rng(count)
+            transforms = scatter_engine.ScatterTransforms(
+                rng.random((count, 3)) * 100, rng.random((count, 3)) * 360,
+                rng.random((count, 3)) + 1)
+            path = os.path.join(folder, "cache{}{}".format(
+                count, point_cache.EXTENSION))
+            write_seconds, _ = timed(point_cache.write, path, transforms,
+                                     sources=["rock"])
+            npz_path = os.path.join(folder, "cache{}.npz".format(count))
+            np.savez(npz_path, translate=transforms.translate,
+                     rotate=transforms.rotate, scale=transforms.scale)
+
+            def read_range():
+                with point_cache.PointCache(path) as cache:
+                    middle = len(cache) // 2
+                    return cache.transforms(middle, middle + 1000).matrices()
+
+            def read_npz():
+                with np.load(npz_path) as cache:
+                    return dict((name, cache[name]) for name in cache.files)
+
+            range_seconds, _ = timed(read_range)
+            npz_seconds, _ = timed(read_npz)
+            print("point cache {:>8} points: write {:.4f}s, {:.1f}MB, "
+                  "open and read 1000 {:.4f}s, npz load {:.4f}s".format(
+                      count, write_seconds, os.path.getsize(path) / 1e6,
+                      range_seconds, npz_seconds))
+            if range_seconds > budget:
+                failures.append("point cache {}".format(count))
+    finally:
+        shutil.rmtree(folder)
+    return failures
+
+
+def legacy_next_avail_ver(folder, descriptor, task, ext):
+    """The original list, fnmatch and sort SceneFile.next_avail_ver"""
+    pattern = "{descriptor}_{task}_v*{ext}".format(
+        descriptor=descriptor, task=task, ext=ext)
+    matching_scenefiles = sorted(
+        (name for name in os.listdir(folder)
+         if fnmatch.fnmatch(name, pattern)), reverse=True)
+    if not matching_scenefiles:
+        return 1
+    latest_scenefile = os.path.splitext(matching_scenefiles[0])[0]
+    return int(latest_scenefile.split("_v")[-1]) + 1
+
+
+class _FileSceneFile(smartsave.SceneFile):
+    """Saves an empty file where Maya would save the scene"""
+
+    __slots__ = ()
+
+    def _save_as(self, path):
+        open(str(path), "w").close()
+        return str(path)
+
+
+def bench_version_index(file_count=50000, repeats=20, cycles=5):
+    """Times next_avail_ver lookups and save+increment cycles
+
+    Returns a failure when the cycles scanned the folder more than once,
+    as a save must not make the index rescan.
+    """
+    failures = []
+    folder = tempfile.mkdtemp()
+    try:
+        for index in range(file_count):
+            name = "asset{}_model_v{:03d}.ma".format(index % 500,
+                                                     index // 500 + 1)
+            open(os.path.join(folder, name), "w").close()
+        legacy_seconds, _ = timed(legacy_next_avail_ver, folder, "asset7",
+                                  "model", ".ma")
+        index = version_index.VersionIndex()
+        cold_seconds, _ = timed(index.next_version, folder, "asset7",
+                                "model", ".ma")
+        start = time.perf_counter()
+        for _ in range(repeats):
+            index.next_version(folder, "asset7", "model", ".ma")
+        warm_seconds = (time.perf_counter() - start) / repeats
+        print("version_index {} files: legacy {:.4f}s, cold {:.4f}s, "
+              "warm {:.6f}s".format(file_count, legacy_seconds,
+                                    cold_seconds, warm_seconds))
+        scene_file = _FileSceneFile(os.path.join(folder,
+                                                 "asset7_model_v001.ma"))
+        version_index.INDEX.invalidate()
+        recorder = instrument.enable()
+        try:
+            start = time.perf_counter()
+            for _ in range(cycles):
+                scene_file.save_increment()
+            cycle_seconds = (time.perf_counter() - start) / cycles
+        finally:
+            instrument.disable()
+        scans = recorder.counters.get("version_index.scans", 0)
+        print("version_index {} save+increment cycles: {:.4f}s each, "
+              "{} folder scans".format(cycles, cycle_seconds, scans))
+        if scans > 1:
+            failures.append("version_index rescans on save")
+    finally:
+        shutil.rmtree(folder)
+    return failures
+
+
+class LegacySceneFile(object):
+    """The original dict based SceneFile, for comparison"""
+
+    def __init__(self, path):
+        path = Path(path)
+        self.folder_path = path.parent
+        self.descriptor, self.task, ver = path.stem.split("_")
+        self.ver = int(ver.split("v")[-1])
+        self.ext = path.suffix
+
+    @property
+    def filename(self):
+        pattern = "{descriptor}_{task}_v{ver:03d}{ext}"
+        return pattern.format(descriptor=self.descriptor,
+                              task=self.task,
+                              ver=self.ver,
+                              ext=self.ext)
+
+    @property
+    def path(self):
+        return self.folder_path / self.filename
+
+
+def _measure_scene_files(build, paths):
+    tracemalloc.start()
+    seconds, scene_files = timed(build, paths)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for scene_file in scene_files:
+        scene_file.path
+        scene_file.path
+    access_seconds = time.perf_counter() - start
+    return seconds, memory, access_seconds
+
+
+def bench_scene_files(count=1000000, folders=1000):
+    """Compares building and using 1M legacy and slotted SceneFiles"""
+    paths = ["/project/asset{}/scenes/asset{}_model_v{:03d}.ma".format(
+        index % folders, index % folders, index // folders + 1)
+        for index in range(count)]
+    for label, build in (
+            ("legacy", lambda paths: [LegacySceneFile(path)
+                                      for path in paths]),
+            ("from_many", scenefile.SceneFile.from_many)):
+        seconds, memory, access_seconds = _measure_scene_files(build, paths)
+        print("scene_files {} {:>9}: build {:.2f}s, {:.0f} MB, "
+              "2x path {:.2f}s".format(label, count, seconds,
+                                       memory / (1024.0 * 1024.0),
+                                       access_seconds))
+
+
+def _synthetic_ma_lines(rng, count):
+    return ["setAttr \".pt[{}]\" -type \"float3\" {:.4f} {:.4f} {:.4f};\n"
+            .format(index, *rng.uniform(-10.0, 10.0, 3)).encode()
+            for index in range(count)]
+
+
+def bench_dedup_store(versions=10, lines=400000, edits=20):
+    """Saves increments that differ by a few lines into a ChunkStore
+
+    Reports the dedup ratio and store and restore throughput.
+    """
+    rng = np.random.default_rng(0)
+    folder = tempfile.mkdtemp()
+    try:
+        store = dedup_store.ChunkStore(os.path.join(folder, "store"))
+        scene_lines = _synthetic_ma_lines(rng, lines)
+        logical = 0
+        store_seconds = 0.0
+        restore_seconds = 0.0
+        for ver in range(1, versions + 1):
+            for _ in range(edits):
+                scene_lines.insert(int(rng.integers(len(scene_lines))),
+                                   b"// edited\n")
+            source = os.path.join(folder, "tank_model_v{:03d}.ma".format(ver))
+            with open(source, "wb") as scene:
+                scene.writelines(scene_lines)
+            logical += os.path.getsize(source)
+            manifest = dedup_store.manifest_path(source)
+            seconds, _ = timed(store.store_file, source, manifest)
+            store_seconds += seconds
+            seconds, _ = timed(store.restore_file, manifest,
+                               source + ".restored")
+            restore_seconds += seconds
+            os.remove(source + ".restored")
+        megabytes = logical / (1024.0 * 1024.0)
+        print("dedup_store {} versions, {:.0f} MB: ratio {:.1f}x, "
+              "store {:.0f} MB/s, restore {:.0f} MB/s".format(
+                  versions, megabytes, float(logical) / store.stored_size(),
+                  megabytes / store_seconds, megabytes / restore_seconds))
+    finally:
+        shutil.rmtree(folder)
+
+
+HOST_MODULES = ("maya", "pymel", "PySide2", "shiboken2")
+IMPORT_LIGHT_MODULES = ("scene_name", "scenefile", "smartsave",
+                        "version_index", "smartsave_batch",
+                        "scene_history", "dedup_store", "sampling",
+                        "scatter_engine", "geometry", "surface_sampling",
+                        "poisson", "scatter_output", "scatter_job",
+                        "placement", "batch_scatter", "weight_maps",
+                        "scatter_preview", "rescatter", "instrument",
+                        "point_cache")
+
+
+def bench_import_time(modules=IMPORT_LIGHT_MODULES, budget=0.5):
+    """Times each core module import in a fresh interpreter
+
+    Returns the modules that went over budget seconds or pulled in Maya
+    or Qt, so it can be used as a regression gate.
+    """
+    script = ("import sys, time\n"
+              "start = time.perf_counter()\n"
+              "import {module}\n"
+              "seconds = time.perf_counter() - start\n"
+              "hosts = [name for name in {hosts!r} if name in sys.modules]\n"
+              "print(seconds, ' '.join(hosts))\n")
+    folder = os.path.dirname(os.path.abspath(__file__))
+    failures = []
+    for module in modules:
+        output = subprocess.check_output(
+            [sys.executable, "-c",
+             script.format(module=module, hosts=HOST_MODULES)],
+            cwd=folder).decode().split()
+        seconds, hosts = float(output[0]), output[1:]
+        print("import {:<18} {:.4f}s {}".format(module, seconds,
+                                                " ".join(hosts)))
+        if seconds > budget or hosts:
+            failures.append(module)
+    return failures
+
+
+BENCHMARKS = ("scatter_engine", "sampling", "poisson", "batch_scatter",
+              "weighted_sampling", "preview", "instrument", "point_cache",
+              "version_index",
+              "scene_files", "dedup_store", "import_time")
+
+
+def main(names=None):
+    """Runs the named benchmarks, all of them by default"""
+    failures = []
+    for name in names or BENCHMARKS:
+        result = globals()["bench_" + name]()
+        if result:
+            failures.extend(result)
+    if failures:
+        print("Over budget: " + ", ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,119 @@
+"""Content addressed, deduplicating storage for saved scene versions.
+
+Scene files are cut into content defined chunks at line boundaries, so
+an edit only changes the chunks around it. Chunks are stored once by
+their sha1 and each saved version becomes a small manifest listing its
+chunks.
+"""
+import hashlib
+import json
+import os
+import zlib
+
+import scene_name
+
+MANIFEST_SUFFIX = scene_name.STORED_SUFFIX
+MIN_SIZE = 2 * 1024
+MAX_SIZE = 256 * 1024
+
+
+def iter_chunks(stream, min_size=MIN_SIZE, max_size=MAX_SIZE,
+                average_lines=256):
+    """Yields content defined chunks of a binary stream
+
+    Boundaries depend only on the lines before them, so inserting or
+    removing data shifts at most the chunks it touches. Memory use is
+    bounded by max_size plus the longest line, whatever the file size.
+    """
+    # A line ends a chunk when the low bits of its crc are all zero,
+    # which happens about once every average_lines lines
+    mask = _boundary_mask(average_lines)
+    chunk = []
+    size = 0
+    for line in stream:
+        while len(line) > max_size:
+            if chunk:
+                yield b"".join(chunk)
+                chunk, size = [], 0
+            yield line[:max_size]
+            line = line[max_size:]
+        chunk.append(line)
+        size += len(line)
+        if size >= max_size or (size >= min_size and
+                                not zlib.crc32(line) & mask):
+            yield b"".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+def _boundary_mask(average_lines):
+    return (1 << max(0, int(average_lines).bit_length() - 1)) - 1
+
+
+class ChunkStore(object):
+    """Stores chunks once under root/chunks, keyed by their sha1"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(str(root))
+        self.chunk_folder = os.path.join(self.root, "chunks")
+
+    def chunk_path(self, digest):
+        return os.path.join(self.chunk_folder, digest[:2], digest)
+
+    def put(self, chunk):
+        """Stores a chunk if it's new and returns its digest"""
+        digest = hashlib.sha1(chunk).hexdigest()
+        path = self.chunk_path(digest)
+        if not os.path.exists(path):
+            folder = os.path.dirname(path)
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            partial = path + ".part"
+            with open(partial, "wb") as chunk_file:
+                chunk_file.write(chunk)
+            os.replace(partial, path)
+        return digest
+
+    def get(self, digest):
+        with open(self.chunk_path(digest), "rb") as chunk_file:
+            return chunk_file.read()
+
+    def store_file(self, source, manifest_path):
+        """Chunks source into the store and writes its manifest"""
+        digests = []
+        size = 0
+        with open(str(source), "rb") as source_file:
+            for chunk in iter_chunks(source_file):
+                digests.append(self.put(chunk))
+                size += len(chunk)
+        manifest = {"size": size, "chunks": digests}
+        partial = str(manifest_path) + ".part"
+        with open(partial, "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(partial, str(manifest_path))
+        return manifest
+
+    def restore_file(self, manifest_path, target):
+        """Rebuilds a stored file from its manifest, streaming chunks"""
+        with open(str(manifest_path)) as manifest_file:
+            manifest = json.load(manifest_file)
+        partial = str(target) + ".part"
+        with open(partial, "wb") as target_file:
+            for digest in manifest["chunks"]:
+                target_file.write(self.get(digest))
+        os.replace(partial, str(target))
+        return str(target)
+
+    def stored_size(self):
+        """Returns the bytes used by every stored chunk"""
+        total = 0
+        for folder, _, names in os.walk(self.chunk_folder):
+            for name in names:
+                total += os.path.getsize(os.path.join(folder, name))
+        return total
+
+
+def manifest_path(path):
+    """Returns the manifest path that stands in for a stored scene"""
+    return str(path) + MANIFEST_SUFFIX
@@ -0,0 +1,179 @@
+"""Geometry sources that hand the scatter tool whole vertex buffers."""
+import hashlib
+
+import numpy as np
+
+
+class GeometrySource(object):
+    """World space vertex positions and normals as contiguous arrays.
+
+    positions and normals are (n, 3) arrays. Callers index into them
+    directly, vertex_name only builds a Maya component name when one is
+    actually needed. triangles is a (t, 3) array of indices into the
+    same buffers, covering the triangles whose corners are all present.
+    colors is an optional (n, 4) array of RGBA vertex colors. The
+    buffers are treated as read-only once the source is built.
+    """
+
+    def __init__(self, positions, normals, meshes, mesh_ids, vertex_ids,
+                 triangles, colors=None):
+        self.positions = positions
+        self.normals = normals
+        self.meshes = meshes
+        self.mesh_ids = mesh_ids
+        self.vertex_ids = vertex_ids
+        self.triangles = triangles
+        self.colors = colors
+        self._cache_key = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def cache_key(self):
+        """Returns a key that changes whenever the geometry changes
+
+        Normals and colors are part of it, as alignment and vertex color
+        weights are computed from them. Hashing the buffers takes about
+        0.1s for a million vertices, so it is done once per source, which
+        the preview keeps while the destination is unchanged.
+        """
+        if self._cache_key is None:
+            self._cache_key = (tuple(self.meshes), self.positions.shape) + \
+                tuple(None if array is None else hash(array.tobytes())
+                      for array in (self.positions, self.normals,
+                                    self.triangles, self.colors))
+        return self._cache_key
+
+    def digest(self):
+        """Returns a sha1 of the geometry that is stable across sessions"""
+        digest = hashlib.sha1("|".join(self.meshes).encode("utf-8"))
+        for array in (self.positions, self.normals, self.triangles,
+                      self.colors):
+            if array is not None:
+                digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def vertex_name(self, index):
+        """Returns the Maya component name of a buffer index"""
+        return "{}.vtx[{}]".format(self.meshes[self.mesh_ids[index]],
+                                   self.vertex_ids[index])
+
+
+class MockMeshSource(GeometrySource):
+    """A pure python mesh for running the scatter math outside Maya"""
+
+    def __init__(self, positions, normals=None, triangles=None,
+                 name="mockMesh", dtype=np.float64, colors=None):
+        positions = np.ascontiguousarray(positions, dtype=dtype)
+        if normals is None:
+            normals = np.zeros_like(positions)
+            normals[:, 1] = 1.0
+        normals = np.ascontiguousarray(normals, dtype=dtype)
+        if triangles is None:
+            triangles = np.empty((0, 3), dtype=np.int64)
+        triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        if colors is not None:
+            colors = np.ascontiguousarray(colors, dtype=dtype).reshape(-1, 4)
+        count = len(positions)
+        super(MockMeshSource, self).__init__(
+            positions, normals, [name], np.zeros(count, dtype=np.int64),
+            np.arange(count), triangles, colors)
+
+    @classmethod
+    def plane(cls, rows, columns, size=100.0, dtype=np.float64):
+        """Builds a flat rows x columns vertex grid facing up"""
+        x = np.linspace(-size / 2.0, size / 2.0, columns)
+        z = np.linspace(-size / 2.0, size / 2.0, rows)
+        grid_x, grid_z = np.meshgrid(x, z)
+        positions = np.column_stack([grid_x.ravel(),
+                                     np.zeros(rows * columns),
+                                     grid_z.ravel()])
+        corners = np.arange(rows * columns).reshape(rows, columns)
+        corners = corners[:-1, :-1].ravel()
+        triangles = np.concatenate([
+            np.column_stack([corners, corners + columns, corners + 1]),
+            np.column_stack([corners + 1, corners + columns,
+                             corners + columns + 1])])
+        return cls(positions, triangles=triangles, name="mockPlane",
+                   dtype=dtype)
+
+
+class MayaMeshSource(GeometrySource):
+    """Reads every selected vertex of one or more meshes in bulk
+
+    components is anything cmds.select accepts, such as mesh names or
+    compacted vertex ranges from cmds.polyListComponentConversion. Each
+    mesh is read with a single MFnMesh query instead of one
+    cmds.pointPosition call per vertex. Vertex colors are only read when
+    a color_set is given, an empty string meaning each mesh's current
+    color set.
+    """
+
+    def __init__(self, components, dtype=np.float64, color_set=None):
+        import maya.api.OpenMaya as om
+        selection = om.MSelectionList()
+        for component in components:
+            selection.add(component)
+        meshes, positions, normals, mesh_ids, vertex_ids = [], [], [], [], []
+        triangles, colors = [], []
+        offset = 0
+        for index in range(selection.length()):
+            dag_path, component = selection.getComponent(index)
+            if dag_path.apiType() == om.MFn.kTransform:
+                dag_path.extendToShape()
+            mesh = om.MFnMesh(dag_path)
+            points = np.array(mesh.getPoints(om.MSpace.kWorld),
+                              dtype=dtype)[:, :3]
+            vertex_normals = np.array(
+                mesh.getVertexNormals(False, om.MSpace.kWorld), dtype=dtype)
+            if component.isNull():
+                ids = np.arange(len(points))
+            else:
+                ids = np.array(
+                    om.MFnSingleIndexedComponent(component).getElements(),
+                    dtype=np.int64)
+            meshes.append(dag_path.partialPathName())
+            positions.append(points[ids])
+            normals.append(vertex_normals[ids])
+            mesh_ids.append(np.full(len(ids), index, dtype=np.int64))
+            vertex_ids.append(ids)
+            triangles.append(_buffer_triangles(mesh, ids, len(points),
+                                               offset))
+            if color_set is not None:
+                colors.append(_vertex_colors(mesh, color_set, dtype)[ids])
+            offset += len(ids)
+        super(MayaMeshSource, self).__init__(
+            np.ascontiguousarray(_concatenate(positions, (0, 3), dtype)),
+            np.ascontiguousarray(_concatenate(normals, (0, 3), dtype)),
+            meshes, _concatenate(mesh_ids, (0,), np.int64),
+            _concatenate(vertex_ids, (0,), np.int64),
+            _concatenate(triangles, (0, 3), np.int64),
+            _concatenate(colors, (0, 4), dtype) if color_set is not None
+            else None)
+
+
+def _buffer_triangles(mesh, ids, vertex_count, offset):
+    """Returns the mesh triangles remapped to buffer indices"""
+    _, triangle_vertices = mesh.getTriangles()
+    lookup = np.full(vertex_count, -1, dtype=np.int64)
+    lookup[ids] = offset + np.arange(len(ids))
+    triangles = lookup[np.array(triangle_vertices, dtype=np.int64)]
+    triangles = triangles.reshape(-1, 3)
+    return triangles[(triangles >= 0).all(axis=1)]
+
+
+def _vertex_colors(mesh, color_set, dtype):
+    """Returns a mesh's RGBA vertex colors, unset vertices being black"""
+    color_set = color_set or mesh.currentColorSetName()
+    if color_set not in mesh.getColorSetNames():
+        return np.zeros((mesh.numVertices, 4), dtype=dtype)
+    colors = np.array([tuple(color) for color in
+                       mesh.getVertexColors(color_set)], dtype=dtype)
+    # Maya returns -1 for every channel of vertices without a color
+    return np.clip(colors.reshape(-1, 4), 0.0, None)
+
+
+def _concatenate(arrays, empty_shape, dtype):
+    if not arrays:
+        return np.empty(empty_shape, dtype=dtype)
+    return np.concatenate(arrays)
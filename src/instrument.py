@@ -0,0 +1,198 @@
+"""Lightweight timers, counters and spans for slow saves and scatters.
+
+Instrumentation is off by default. span() then hands back one shared
+no-op context manager and count() returns straight away, so the hooks
+can stay in hot paths. Once enabled, spans and counter totals are kept
+in a Recorder and exported as JSON lines, one span per line for
+aggregating across sessions, or as a Chrome trace for chrome://tracing.
+
+Setting the INSTRUMENT_TRACE environment variable to a .jsonl or .json
+path enables instrumentation on import and exports there on exit.
+"""
+import atexit
+import functools
+import getpass
+import json
+import os
+import socket
+import threading
+import time
+
+TRACE_ENV = "INSTRUMENT_TRACE"
+
+_recorder = None
+
+
+class _NullSpan(object):
+    """What span returns while instrumentation is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span(object):
+    """Times a block and adds it to its recorder when the block exits"""
+
+    __slots__ = ("recorder", "name", "args", "start")
+
+    def __init__(self, recorder, name, args):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.recorder.add_span(self.name, self.start, seconds, self.args)
+        return False
+
+    def set(self, **args):
+        """Adds details that are only known inside the block"""
+        self.args.update(args)
+
+
+class Recorder(object):
+    """Collects spans and counter totals of one session"""
+
+    def __init__(self):
+        self.spans = []
+        self.counters = {}
+        self.session = {"user": _user(),
+                        "host": socket.gethostname(), "pid": os.getpid(),
+                        "started": time.time()}
+        # Maps perf_counter readings onto wall clock times
+        self._epoch = time.time() - time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_span(self, name, start, seconds, args):
+        self.spans.append((name, start, seconds, threading.get_ident(),
+                           args))
+
+    def count(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        """Returns {name: {"count", "seconds", "max_seconds"}} of spans"""
+        totals = {}
+        for name, _, seconds, _, _ in self.spans:
+            total = totals.setdefault(name, {"count": 0, "seconds": 0.0,
+                                             "max_seconds": 0.0})
+            total["count"] += 1
+            total["seconds"] += seconds
+            total["max_seconds"] = max(total["max_seconds"], seconds)
+        return totals
+
+    def write_jsonl(self, path):
+        """Appends one line per span and one with the counter totals"""
+        with open(path, "a") as trace:
+            for name, start, seconds, thread, args in self.spans:
+                trace.write(json.dumps({
+                    "type": "span", "name": name,
+                    "start": self._epoch + start, "seconds": seconds,
+                    "thread": thread, "args": args,
+                    "session": self.session}) + "\n")
+            trace.write(json.dumps({"type": "counters",
+                                    "counters": self.counters,
+                                    "session": self.session}) + "\n")
+
+    def write_chrome_trace(self, path):
+        """Writes a trace file chrome://tracing and Perfetto can open"""
+        pid = self.session["pid"]
+        events = [{"name": name, "cat": name.split(".")[0], "ph": "X",
+                   "ts": (self._epoch + start) * 1e6, "dur": seconds * 1e6,
+                   "pid": pid, "tid": thread, "args": args}
+                  for name, start, seconds, thread, args in self.spans]
+        end = max([event["ts"] + event["dur"] for event in events] or
+                  [time.time() * 1e6])
+        events.extend({"name": name, "ph": "C", "ts": end, "pid": pid,
+                       "tid": 0, "args": {"value": value}}
+                      for name, value in self.counters.items())
+        with open(path, "w") as trace:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": self.session}, trace)
+
+    def export(self, path):
+        """Writes a Chrome trace for .json paths, JSON lines otherwise"""
+        if str(path).endswith(".json"):
+            self.write_chrome_trace(path)
+        else:
+            self.write_jsonl(path)
+        return path
+
+
+def _user():
+    try:
+        return getpass.getuser()
+    except (KeyError, OSError):
+        return None
+
+
+def enabled():
+    return _recorder is not None
+
+
+def enable(recorder=None):
+    """Starts recording, into recorder or a new one, and returns it"""
+    global _recorder
+    _recorder = recorder or Recorder()
+    return _recorder
+
+
+def disable():
+    """Stops recording and returns what was recorded, or None"""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def span(name, **args):
+    """Returns a context manager that records how long its block takes"""
+    if _recorder is None:
+        return _NULL_SPAN
+    return Span(_recorder, name, args)
+
+
+def count(name, value=1):
+    """Adds value to a counter"""
+    if _recorder is not None:
+        _recorder.count(name, value)
+
+
+def timed(name):
+    """Decorates a function so every call is recorded as a span"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with Span(_recorder, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _export_on_exit(path):
+    recorder = disable()
+    if recorder is not None:
+        recorder.export(path)
+
+
+if os.environ.get(TRACE_ENV):
+    enable()
+    atexit.register(_export_on_exit, os.environ[TRACE_ENV])
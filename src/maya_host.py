@@ -0,0 +1,7 @@
+"""Access to Maya for modules that also run outside of it."""
+
+
+def maya_cmds():
+    """Returns maya.cmds, imported only once a command is needed"""
+    import maya.cmds as cmds
+    return cmds
@@ -0,0 +1,177 @@
+"""A maya.cmds stand-in that records calls, for running tools headless."""
+import collections
+import fnmatch
+import tempfile
+import time
+
+
+class RecordingCmds(object):
+    """Counts every command called on it and keeps a tiny fake scene
+
+    Each call adds latency seconds to simulated_seconds, and sleeps for
+    them too when sleep is True. Only the commands the scatter tool uses
+    are implemented, any other command is recorded and returns None.
+    """
+
+    def __init__(self, latency=0.0, sleep=False, workspace_root=None):
+        self.latency = latency
+        self.sleep = sleep
+        self.workspace_root = workspace_root or tempfile.gettempdir()
+        self.calls = collections.Counter()
+        self.simulated_seconds = 0.0
+        # Node names mapped to their parent's name, or None
+        self.nodes = collections.OrderedDict()
+        self.attributes = {}
+        self._name_counter = 0
+
+    def __getattr__(self, command):
+        if command.startswith("_"):
+            raise AttributeError(command)
+
+        def record(*args, **kwargs):
+            self._record(command)
+        return record
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def reset(self):
+        """Forgets the recorded calls, keeping the fake scene"""
+        self.calls.clear()
+        self.simulated_seconds = 0.0
+
+    def _record(self, command):
+        self.calls[command] += 1
+        self.simulated_seconds += self.latency
+        if self.sleep and self.latency:
+            time.sleep(self.latency)
+
+    def _create(self, name, parent=None):
+        self._name_counter += 1
+        name = name.replace("#", str(self._name_counter))
+        while name in self.nodes:
+            self._name_counter += 1
+            name = "{}{}".format(name.rstrip("0123456789"),
+                                 self._name_counter)
+        self.nodes[name] = parent
+        return name
+
+    def group(self, *objects, **kwargs):
+        self._record("group")
+        return self._create(kwargs.get("name", "group#"))
+
+    def instance(self, *objects, **kwargs):
+        self._record("instance")
+        return [self._create(kwargs.get("name", objects[0] + "#"))]
+
+    def particle(self, **kwargs):
+        self._record("particle")
+        particle = self._create(kwargs.get("name", "particle#"))
+        return [particle, self._create(particle + "Shape", particle)]
+
+    def particleInstancer(self, *objects, **kwargs):
+        self._record("particleInstancer")
+        return self._create(kwargs.get("name", "instancer#"))
+
+    def normalConstraint(self, *objects, **kwargs):
+        self._record("normalConstraint")
+        return [self._create("normalConstraint#", objects[-1])]
+
+    def parent(self, *objects, **kwargs):
+        self._record("parent")
+        children = objects[0] if len(objects) == 2 else objects[:-1]
+        if not isinstance(children, (list, tuple)):
+            children = [children]
+        for child in children:
+            self.nodes[child] = objects[-1]
+        return list(children)
+
+    def delete(self, *objects, **kwargs):
+        self._record("delete")
+        doomed = set(self._flatten(objects))
+        for name, parent in list(self.nodes.items()):
+            if name in doomed or parent in doomed:
+                doomed.add(name)
+        for name in doomed:
+            self.nodes.pop(name, None)
+
+    def objExists(self, name):
+        self._record("objExists")
+        return name.split(".")[0] in self.nodes
+
+    def objectType(self, name):
+        self._record("objectType")
+        return "transform"
+
+    def ls(self, *objects, **kwargs):
+        self._record("ls")
+        if not objects:
+            return list(self.nodes)
+        found = []
+        for pattern in self._flatten(objects):
+            found.extend(name for name in self.nodes
+                         if fnmatch.fnmatchcase(name, pattern))
+        return found
+
+    def listRelatives(self, node, **kwargs):
+        self._record("listRelatives")
+        return [name for name, parent in self.nodes.items()
+                if parent == node] or None
+
+    def polyListComponentConversion(self, *objects, **kwargs):
+        self._record("polyListComponentConversion")
+        return list(self._flatten(objects))
+
+    def attributeQuery(self, attribute, node=None, **kwargs):
+        self._record("attributeQuery")
+        return (node, attribute) in self.attributes
+
+    def addAttr(self, node, longName=None, **kwargs):
+        self._record("addAttr")
+        if (node, longName) in self.attributes:
+            # What Maya raises, so a missing attributeQuery guard shows
+            raise RuntimeError("Found conflicting attribute {}.{}".format(
+                node, longName))
+        self.attributes[(node, longName)] = None
+
+    def deleteAttr(self, node, attribute=None, **kwargs):
+        self._record("deleteAttr")
+        if attribute is None:
+            node, attribute = node.split(".", 1)
+        self.attributes.pop((node, attribute), None)
+
+    def setAttr(self, plug, *values, **kwargs):
+        self._record("setAttr")
+        node, attribute = plug.split(".", 1)
+        self.attributes[(node, attribute)] = (
+            values[0] if len(values) == 1 else values)
+
+    def getAttr(self, plug, **kwargs):
+        self._record("getAttr")
+        node, attribute = plug.split(".", 1)
+        return self.attributes.get((node, attribute))
+
+    def xform(self, node, query=False, **kwargs):
+        self._record("xform")
+        if query:
+            return [0.0, 0.0, 0.0]
+
+    def undoInfo(self, query=False, **kwargs):
+        self._record("undoInfo")
+        if query:
+            return True
+
+    def workspace(self, query=False, **kwargs):
+        self._record("workspace")
+        if query:
+            return self.workspace_root
+
+    @staticmethod
+    def _flatten(objects):
+        for item in objects:
+            if isinstance(item, (list, tuple)):
+                for name in item:
+                    yield name
+            else:
+                yield item
@@ -0,0 +1,194 @@
+"""Computes where scatter instances go from a geometry source and settings.
+
+Nothing here touches Maya, so placements can be computed in other
+processes and only applied in the host.
+"""
+import numpy as np
+
+import poisson
+import sampling
+import scatter_engine
+import surface_sampling
+import weight_maps
+
+VERTEX_MODE = "Vertices"
+SURFACE_MODE = "Surface"
+
+
+class ScatterSettings(object):
+    """Every option that affects where and how instances are placed"""
+
+    def __init__(self, mode=VERTEX_MODE, percent=100, surface_points=100,
+                 min_distance=0.0, rotate_max=(0, 0, 0), scale_min=(1, 1, 1),
+                 scale_max=(1, 1, 1), align=False, seed=1, weight_map=None):
+        self.mode = mode
+        self.percent = percent
+        self.surface_points = surface_points
+        self.min_distance = min_distance
+        self.rotate_max = tuple(rotate_max)
+        self.scale_min = tuple(scale_min)
+        self.scale_max = tuple(scale_max)
+        self.align = align
+        self.seed = seed
+        self.weight_map = weight_map
+
+    def to_dict(self):
+        """Returns the settings as json friendly builtin types"""
+        data = dict(vars(self))
+        if self.weight_map is not None:
+            data["weight_map"] = self.weight_map.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        if data.get("weight_map") is not None:
+            data["weight_map"] = weight_maps.WeightMap.from_dict(
+                data["weight_map"])
+        return cls(**data)
+
+    def points_key(self):
+        """Returns the settings that pick which points are scattered onto"""
+        weights_key = None
+        if self.weight_map is not None:
+            weights_key = self.weight_map.key()
+        count = self.surface_points if self.mode == SURFACE_MODE else \
+            self.percent
+        return (self.mode, count, self.min_distance, self.seed, weights_key)
+
+    def transforms_key(self):
+        """Returns the settings that turn points into transforms"""
+        return (self.rotate_max, self.scale_min, self.scale_max, self.align,
+                self.seed)
+
+
+class Placement(object):
+    """The computed transforms of a scatter and where they came from
+
+    vertex_ids holds the destination vertex of each instance, or is None
+    for surface scatters. ids identifies each instance across changes of
+    the settings, it is the vertex or the surface sample index.
+    """
+
+    def __init__(self, transforms, normals, vertex_ids, ids):
+        self.transforms = transforms
+        self.normals = normals
+        self.vertex_ids = vertex_ids
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.transforms)
+
+
+def keep_percentage(items, percent, seed=None):
+    """Keeps a random percentage of a list or array of items"""
+    count = sampling.keep_count(len(items), percent)
+    indices = sampling.sample_indices(len(items), count, seed=seed)
+    if isinstance(items, np.ndarray):
+        return items[indices]
+    return [items[index] for index in indices]
+
+
+def scatter_points(source, settings):
+    """Returns the positions, normals, vertex ids and ids to scatter onto
+
+    Surface mode samples points uniformly by area, so it returns None
+    instead of vertex ids. A weight map makes sampling proportional to
+    its weights, in vertex mode the percentage is then taken of the
+    vertices with a weight above 0. A min distance above 0 thins the
+    points out so no two instances are closer than it.
+    """
+    weights = None
+    if settings.weight_map is not None:
+        weights = settings.weight_map.evaluate(source, settings.seed)
+    if settings.mode == SURFACE_MODE:
+        table = surface_sampling.area_table(source, weights)
+        positions, normals, _ = table.sample(settings.surface_points,
+                                             seed=settings.seed)
+        vertex_ids = None
+        ids = np.arange(len(positions))
+    else:
+        if weights is None:
+            vertex_ids = keep_percentage(np.arange(len(source)),
+                                         settings.percent, settings.seed)
+        else:
+            count = sampling.keep_count(np.count_nonzero(weights > 0.0),
+                                        settings.percent)
+            vertex_ids = sampling.weighted_indices(weights, count,
+                                                   seed=settings.seed)
+        positions = source.positions[vertex_ids]
+        normals = source.normals[vertex_ids]
+        ids = vertex_ids
+    if settings.min_distance > 0:
+        kept = poisson.poisson_disk_filter(positions, settings.min_distance,
+                                           seed=settings.seed, ids=ids)
+        positions = positions[kept]
+        normals = normals[kept]
+        ids = ids[kept]
+        if vertex_ids is not None:
+            vertex_ids = vertex_ids[kept]
+    return positions, normals, vertex_ids, ids
+
+
+def compute_placement(source, settings):
+    """Returns the Placement of a scatter onto source"""
+    return place_points(settings, *scatter_points(source, settings))
+
+
+def place_points(settings, positions, normals, vertex_ids, ids,
+                 alignment=None):
+    """Returns the Placement of already sampled points
+
+    alignment is optionally the points' normal alignment matrices.
+    """
+    transforms = scatter_engine.compute_transforms(
+        positions, settings.rotate_max, settings.scale_min,
+        settings.scale_max, seed=settings.seed, ids=ids)
+    if settings.align:
+        transforms = scatter_engine.align_to_normals(transforms, normals,
+                                                     alignment=alignment)
+    return Placement(transforms, normals, vertex_ids, ids)
+
+
+class IncrementalPlacement(object):
+    """Recomputes only the stages of a placement whose inputs changed
+
+    The sampled points and their normal alignment matrices are cached on
+    the geometry and the settings that pick them, so changing only the
+    rotate or scale ranges reuses them and just recomputes the
+    transforms. recomputed lists the stages the last update ran.
+    """
+
+    def __init__(self):
+        self.recomputed = []
+        self.clear()
+
+    def clear(self):
+        """Forgets the cached points and placement"""
+        self._points_key = None
+        self._points = None
+        self._alignment = None
+        self._transforms_key = None
+        self._placement = None
+
+    def update(self, source, settings):
+        """Returns the Placement of settings on source, reusing the cache"""
+        self.recomputed = []
+        points_key = (source.cache_key(), settings.points_key())
+        if points_key != self._points_key:
+            self._points = scatter_points(source, settings)
+            self._points_key = points_key
+            self._alignment = None
+            self._transforms_key = None
+            self.recomputed.append("points")
+        if settings.align and self._alignment is None:
+            self._alignment = scatter_engine.normal_alignment_matrices(
+                self._points[1])
+            self.recomputed.append("alignment")
+        transforms_key = settings.transforms_key()
+        if transforms_key != self._transforms_key:
+            self._placement = place_points(settings, *self._points,
+                                           alignment=self._alignment)
+            self._transforms_key = transforms_key
+            self.recomputed.append("transforms")
+        return self._placement
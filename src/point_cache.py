@@ -0,0 +1,154 @@
+"""A compact, memory-mappable scatter point cache file.
+
+A cache is one file: an 8 byte magic, the byte length of a json header,
+the header, then every column as raw little endian data aligned to 64
+bytes. The header lists each column's dtype, shape and offset, so a
+reader maps the file once and every column, or any range of rows of
+it, is a zero-copy view that only pages in what is actually used.
+
+Columns are translate, rotate and scale (n, 3), ids (n,), the stable
+instance id each point was placed for, and source_ids (n,), an index
+into the header's sources list of scatter object names. The header
+also stores the seed and settings the points were scattered with.
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+import scatter_engine
+
+MAGIC = b"SCATPC01"
+FORMAT = 1
+EXTENSION = ".spc"
+ALIGNMENT = 64
+TRANSFORM_COLUMNS = ("translate", "rotate", "scale")
+_LENGTH = struct.Struct("<Q")
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write(path, transforms, ids=None, sources=(), source_ids=None,
+          seed=None, settings=None, dtype=np.float32):
+    """Writes a point cache atomically and returns its header
+
+    transforms is a ScatterTransforms, ids default to the point index
+    and source_ids to 0, the first of sources. Transform columns are
+    stored as dtype, float32 by default.
+    """
+    count = len(transforms)
+    columns = [(name, np.asarray(getattr(transforms, name)).astype(
+        np.dtype(dtype).newbyteorder("<"), copy=False))
+        for name in TRANSFORM_COLUMNS]
+    if ids is None:
+        ids = np.arange(count)
+    if source_ids is None:
+        source_ids = np.zeros(count, dtype=np.int32)
+    columns.append(("ids", np.asarray(ids).astype("<i8", copy=False)))
+    columns.append(("source_ids",
+                    np.asarray(source_ids).astype("<i4", copy=False)))
+    header = {"format": FORMAT, "count": count, "sources": list(sources),
+              "seed": seed, "settings": settings, "columns": {}}
+    # Offsets are relative to the end of the header, which is aligned
+    # too, so they don't depend on the header's own length
+    offset = 0
+    for name, values in columns:
+        header["columns"][name] = {"dtype": values.dtype.str,
+                                   "shape": list(values.shape),
+                                   "offset": offset}
+        offset = _aligned(offset + values.nbytes)
+    header_bytes = json.dumps(header, sort_keys=True).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + _LENGTH.size + len(header_bytes))
+    folder = os.path.dirname(str(path))
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    partial = str(path) + ".part"
+    with open(partial, "wb") as cache_file:
+        cache_file.write(MAGIC)
+        cache_file.write(_LENGTH.pack(len(header_bytes)))
+        cache_file.write(header_bytes)
+        for name, values in columns:
+            cache_file.seek(data_start + header["columns"][name]["offset"])
+            np.ascontiguousarray(values).tofile(cache_file)
+        # Pad the last column so the file size matches the header
+        cache_file.truncate(data_start + offset)
+    os.replace(partial, str(path))
+    return header
+
+
+def read_header(path):
+    """Returns the header of a cache and where its column data starts"""
+    with open(str(path), "rb") as cache_file:
+        if cache_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("'{}' is not a scatter point cache".format(path))
+        length, = _LENGTH.unpack(cache_file.read(_LENGTH.size))
+        header = json.loads(cache_file.read(length).decode("utf-8"))
+    if header.get("format") != FORMAT:
+        raise ValueError("Unsupported point cache format {}".format(
+            header.get("format")))
+    return header, _aligned(len(MAGIC) + _LENGTH.size + length)
+
+
+class PointCache(object):
+    """A read-only, memory-mapped view of a point cache file
+
+    Columns and ranges of them are numpy views of the mapped file, so
+    opening a cache of millions of points reads only its header.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.header, self._data_start = read_header(self.path)
+        self._map = np.memmap(self.path, dtype=np.uint8, mode="r")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.header["count"]
+
+    @property
+    def sources(self):
+        return self.header["sources"]
+
+    @property
+    def seed(self):
+        return self.header["seed"]
+
+    @property
+    def settings(self):
+        return self.header["settings"]
+
+    def column(self, name, start=0, stop=None):
+        """Returns rows start to stop of a column without copying"""
+        info = self.header["columns"][name]
+        shape = list(info["shape"])
+        start, stop, _ = slice(start, stop).indices(shape[0])
+        stop = max(start, stop)
+        dtype = np.dtype(info["dtype"])
+        row_size = dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64))
+        shape[0] = stop - start
+        return np.ndarray(shape, dtype=dtype, buffer=self._map,
+                          offset=self._data_start + info["offset"] +
+                          start * row_size)
+
+    def transforms(self, start=0, stop=None):
+        """Returns a ScatterTransforms of a range of points"""
+        return scatter_engine.ScatterTransforms(
+            *[self.column(name, start, stop) for name in TRANSFORM_COLUMNS])
+
+    def iter_chunks(self, chunk_size=100000):
+        """Yields (start, ScatterTransforms) of consecutive ranges"""
+        for start in range(0, len(self), chunk_size):
+            yield start, self.transforms(start, start + chunk_size)
+
+    def close(self):
+        """Drops the mapping, which is unmapped once no views are left"""
+        self._map = None
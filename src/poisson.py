@@ -0,0 +1,73 @@
+"""Minimum distance (Poisson disk) filtering of scatter points."""
+import math
+
+import numpy as np
+
+import random_streams
+
+
+class SpatialHashGrid(object):
+    """A uniform hash grid for finding points within a fixed radius
+
+    The cell size equals the radius, so a query only looks at the 27
+    cells around a point and stays close to O(1) per lookup however many
+    points the grid holds.
+    """
+
+    def __init__(self, radius):
+        self.radius = float(radius)
+        self._radius_squared = self.radius * self.radius
+        self._cells = {}
+
+    def _cell(self, point):
+        return (int(math.floor(point[0] / self.radius)),
+                int(math.floor(point[1] / self.radius)),
+                int(math.floor(point[2] / self.radius)))
+
+    def insert(self, point):
+        """Adds a point to the grid"""
+        self._cells.setdefault(self._cell(point), []).append(point)
+
+    def has_neighbour(self, point):
+        """Returns True if a stored point is closer than the radius"""
+        x, y, z = self._cell(point)
+        for cell_x in (x - 1, x, x + 1):
+            for cell_y in (y - 1, y, y + 1):
+                for cell_z in (z - 1, z, z + 1):
+                    for other in self._cells.get((cell_x, cell_y, cell_z),
+                                                 ()):
+                        distance = ((point[0] - other[0]) ** 2 +
+                                    (point[1] - other[1]) ** 2 +
+                                    (point[2] - other[2]) ** 2)
+                        if distance < self._radius_squared:
+                            return True
+        return False
+
+
+def poisson_disk_filter(positions, min_distance, seed=None, ids=None):
+    """Returns sorted indices of points at least min_distance apart
+
+    Candidates are visited in a random order and rejected when an
+    already accepted point is too close, which gives a blue noise
+    subset of the candidates. ids optionally gives every candidate a
+    stable identity its place in the order is drawn for, so adding or
+    removing candidates only changes the kept points around them.
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    if min_distance <= 0 or not len(positions):
+        return np.arange(len(positions))
+    if ids is None:
+        rng = random_streams.stream(seed, random_streams.POISSON)
+        order = rng.permutation(len(positions))
+    else:
+        order = np.argsort(random_streams.indexed_uniform(
+            seed, random_streams.POISSON, ids)[:, 0], kind="stable")
+    grid = SpatialHashGrid(min_distance)
+    kept = []
+    for index, point in zip(order.tolist(), positions[order].tolist()):
+        if not grid.has_neighbour(point):
+            grid.insert(point)
+            kept.append(index)
+    kept = np.array(kept, dtype=np.int64)
+    kept.sort()
+    return kept
@@ -0,0 +1,92 @@
+"""Seedable, independent random streams for reproducible scatters.
+
+Every scatter job has one integer seed. Each thing it randomizes gets
+its own stream spawned from that seed, and per-point values come in
+fixed size blocks with a stream each. A chunk of points therefore gets
+exactly the values the serial run would give it, whichever process
+computes it.
+"""
+import numpy as np
+
+BLOCK_SIZE = 4096
+
+# Stream ids, one per randomized quantity
+SAMPLE = 1
+POISSON = 2
+SURFACE = 3
+ROTATE = 4
+SCALE = 5
+FUNKY = 6
+WEIGHTS = 7
+NOISE = 8
+
+
+def new_seed():
+    """Returns a fresh random seed that fits in a Qt spin box"""
+    return int(np.random.SeedSequence().generate_state(1)[0] >> 1)
+
+
+def resolve(seed):
+    """Returns seed, or a new one when seed is None"""
+    return new_seed() if seed is None else int(seed)
+
+
+def stream(seed, purpose, *keys):
+    """Returns the Generator for one purpose (and block) of a job seed"""
+    sequence = np.random.SeedSequence(resolve(seed),
+                                      spawn_key=(purpose,) + keys)
+    return np.random.default_rng(sequence)
+
+
+def block_uniform(seed, purpose, start, stop, columns=1):
+    """Returns (stop - start, columns) uniform [0, 1) values
+
+    Values are drawn per BLOCK_SIZE block of point indices, so any split
+    of the index range into chunks gives the same values.
+    """
+    seed = resolve(seed)
+    count = max(0, stop - start)
+    values = np.empty((count, columns))
+    first_block = start // BLOCK_SIZE
+    last_block = (stop - 1) // BLOCK_SIZE if count else first_block - 1
+    for block in range(first_block, last_block + 1):
+        block_start = block * BLOCK_SIZE
+        block_values = stream(seed, purpose, block).random(
+            (BLOCK_SIZE, columns))
+        lo = max(start, block_start)
+        hi = min(stop, block_start + BLOCK_SIZE)
+        values[lo - start:hi - start] = block_values[lo - block_start:
+                                                     hi - block_start]
+    return values
+
+
+def indexed_uniform(seed, purpose, ids, columns=1):
+    """Returns (len(ids), columns) uniform values for any point indices
+
+    Each index gets the values block_uniform would give it, but only
+    the blocks the ids fall in are drawn.
+    """
+    seed = resolve(seed)
+    ids = np.asarray(ids, dtype=np.int64)
+    values = np.empty((len(ids), columns))
+    if len(ids) > 1 and (ids[1:] < ids[:-1]).any():
+        order = np.argsort(ids, kind="stable")
+        values[order] = indexed_uniform(seed, purpose, ids[order], columns)
+        return values
+    # Sorted ids fall into runs that each lie in one block
+    blocks = ids // BLOCK_SIZE
+    starts = np.flatnonzero(np.diff(blocks)) + 1
+    bounds = np.concatenate([[0], starts, [len(ids)]])
+    for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        if start == stop:
+            continue
+        block = int(blocks[start])
+        block_values = stream(seed, purpose, block).random(
+            (BLOCK_SIZE, columns))
+        first = int(ids[start]) - block * BLOCK_SIZE
+        if int(ids[stop - 1]) - int(ids[start]) == stop - start - 1:
+            values[start:stop] = block_values[first:first + stop - start]
+        else:
+            values[start:stop] = block_values[ids[start:stop] -
+                                              block * BLOCK_SIZE]
+    return values
@@ -0,0 +1,212 @@
+"""Updating an existing scatter in place instead of rebuilding it.
+
+Every instance group stores what it was made from: the scatter object,
+the destination, the output, the settings, a digest of the destination
+geometry and which node holds which instance id. Applying new settings
+to the group recomputes both placements, which is cheap, and then only
+touches the instances that were added, removed or moved.
+"""
+import json
+import logging
+
+import numpy as np
+
+import maya_host
+import placement
+import scatter_job
+import scatter_output
+
+log = logging.getLogger(__name__)
+
+RECORD_ATTR = "scatterRecord"
+RECORD_FORMAT = 1
+TOLERANCE = 1e-6
+
+
+class ScatterRecord(object):
+    """What an instance group was scattered from
+
+    instances maps instance ids to node names, and is only filled in for
+    outputs that create a node per instance.
+    """
+
+    def __init__(self, scatter_name, destination, output_name, settings,
+                 source_digest, instances=None):
+        self.scatter_name = scatter_name
+        self.destination = list(destination)
+        self.output_name = output_name
+        self.settings = settings
+        self.source_digest = source_digest
+        self.instances = instances or {}
+
+    def to_json(self):
+        return json.dumps({
+            "format": RECORD_FORMAT, "scatter_name": self.scatter_name,
+            "destination": self.destination, "output": self.output_name,
+            "settings": self.settings.to_dict(),
+            "source_digest": self.source_digest,
+            "instances": [[int(instance_id), name] for instance_id, name
+                          in self.instances.items()]})
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        if data.get("format") != RECORD_FORMAT:
+            return None
+        return cls(data["scatter_name"], data["destination"], data["output"],
+                   placement.ScatterSettings.from_dict(data["settings"]),
+                   data["source_digest"], dict(data["instances"]))
+
+    @classmethod
+    def read(cls, group, cmds=None):
+        """Returns the record stored on a group, or None"""
+        cmds = cmds or maya_host.maya_cmds()
+        if not cmds.attributeQuery(RECORD_ATTR, node=group, exists=True):
+            return None
+        try:
+            return cls.from_json(cmds.getAttr(group + "." + RECORD_ATTR))
+        except (TypeError, ValueError, KeyError):
+            log.warning("Ignoring the unreadable scatter record of %s", group)
+            return None
+
+    def write(self, group, cmds=None):
+        """Stores the record on a group"""
+        cmds = cmds or maya_host.maya_cmds()
+        if not cmds.attributeQuery(RECORD_ATTR, node=group, exists=True):
+            cmds.addAttr(group, longName=RECORD_ATTR, dataType="string")
+        cmds.setAttr(group + "." + RECORD_ATTR, self.to_json(),
+                     type="string")
+
+
+def find_group(scatter_name, destination, cmds=None):
+    """Returns the newest group scattered from the same objects, or None"""
+    cmds = cmds or maya_host.maya_cmds()
+    groups = cmds.ls(scatter_name + "_instance_grp*", type="transform") or []
+    for group in reversed(groups):
+        record = ScatterRecord.read(group, cmds)
+        if record and record.destination == list(destination):
+            return group
+    return None
+
+
+def record_scatter(group, scatter_name, destination, output, settings,
+                   source, scatter, created, cmds=None):
+    """Stores how a freshly applied scatter was made on its group"""
+    instances = {}
+    if isinstance(output, scatter_output.TransformsOutput):
+        instances = dict(zip(scatter.ids.tolist(), created))
+    record = ScatterRecord(scatter_name, destination, output.name, settings,
+                           source.digest(), instances)
+    record.write(group, cmds)
+    return record
+
+
+def diff_placements(old, new, tolerance=TOLERANCE):
+    """Returns the removed ids, added and changed indices of new
+
+    Instances are matched on their ids, and a matched instance has
+    changed when any of its transform values moved more than tolerance.
+    """
+    _, old_index, new_index = np.intersect1d(
+        old.ids, new.ids, assume_unique=True, return_indices=True)
+    removed = np.setdiff1d(old.ids, new.ids, assume_unique=True)
+    added = np.flatnonzero(~np.isin(new.ids, old.ids, assume_unique=True))
+    moved = np.zeros(len(new_index), dtype=bool)
+    for values in ("translate", "rotate", "scale"):
+        old_values = getattr(old.transforms, values)[old_index]
+        new_values = getattr(new.transforms, values)[new_index]
+        moved |= (np.abs(old_values - new_values) > tolerance).any(axis=1)
+    return removed, added, new_index[moved]
+
+
+class Rescatter(object):
+    """Brings an existing instance group up to date with new settings
+
+    Groups of other outputs, and groups whose destination geometry
+    changed, have their contents rebuilt in place. Transform groups get
+    only their added, removed and changed instances touched. Instances
+    that were deleted by hand are recreated.
+    """
+
+    def __init__(self, group, record, cmds=None):
+        self.group = group
+        self.record = record
+        self.cmds = cmds or maya_host.maya_cmds()
+        self.removed = 0
+        self.added = 0
+        self.changed = 0
+
+    def run(self, source, settings, output, progress_callback=None):
+        """Applies settings to the group, returns the updated record"""
+        with scatter_job.undo_chunk("rescatter " + self.record.scatter_name,
+                                    self.cmds):
+            new = placement.compute_placement(source, settings)
+            if (not isinstance(output, scatter_output.TransformsOutput) or
+                    self.record.output_name != output.name or
+                    self.record.source_digest != source.digest()):
+                instances = self._rebuild(new, output, progress_callback)
+            else:
+                old = placement.compute_placement(source,
+                                                  self.record.settings)
+                instances = self._update(old, new, output, progress_callback)
+        log.info("Rescattered %s: %d added, %d removed, %d changed",
+                 self.group, self.added, self.removed, self.changed)
+        self.record = ScatterRecord(
+            self.record.scatter_name, self.record.destination, output.name,
+            settings, source.digest(), instances)
+        self.record.write(self.group, self.cmds)
+        return self.record
+
+    def _rebuild(self, new, output, progress_callback):
+        cmds = self.cmds
+        children = cmds.listRelatives(self.group, children=True,
+                                      fullPath=True) or []
+        if children:
+            cmds.delete(children)
+        if (self.record.output_name == scatter_output.PointCacheOutput.name
+                and not isinstance(output, scatter_output.PointCacheOutput)):
+            # A cache left behind would still be read by whatever uses it
+            scatter_output.PointCacheOutput(cmds).remove(self.group)
+        self.removed = len(self.record.instances) or len(children)
+        created = self._write(new.transforms, output, progress_callback)
+        self.added = len(created)
+        if isinstance(output, scatter_output.TransformsOutput):
+            return dict(zip(new.ids.tolist(), created))
+        return {}
+
+    def _update(self, old, new, output, progress_callback):
+        cmds = self.cmds
+        removed, added, changed = diff_placements(old, new)
+        nodes = self.record.instances
+        # Instances deleted by hand are written again like new ones,
+        # found with one ls call instead of an objExists per instance
+        existing = set(cmds.ls(list(nodes.values())) or [])
+        missing = np.array([index for index, instance_id
+                            in enumerate(new.ids.tolist())
+                            if nodes.get(instance_id) not in existing],
+                           dtype=np.int64)
+        added = np.union1d(added, missing)
+        changed = np.setdiff1d(changed, missing)
+        gone = [nodes.pop(instance_id) for instance_id in removed.tolist()]
+        gone = [node for node in gone if node in existing]
+        if gone:
+            cmds.delete(gone)
+        for index in changed.tolist():
+            cmds.xform(nodes[int(new.ids[index])],
+                       translation=new.transforms.translate[index].tolist(),
+                       rotation=new.transforms.rotate[index].tolist(),
+                       scale=new.transforms.scale[index].tolist())
+        created = self._write(new.transforms[added], output,
+                              progress_callback)
+        nodes.update(zip(new.ids[added].tolist(), created))
+        self.removed, self.added, self.changed = (
+            len(removed), len(added), len(changed))
+        return dict((instance_id, nodes[instance_id])
+                    for instance_id in new.ids.tolist()
+                    if instance_id in nodes)
+
+    def _write(self, transforms, output, progress_callback):
+        job = scatter_job.ScatterJob(
+            output, self.record.scatter_name, self.group, transforms,
+            progress_callback=progress_callback, cmds=self.cmds)
+        return job.run()
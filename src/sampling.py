@@ -0,0 +1,127 @@
+"""Linear time sampling for picking which vertices to scatter onto."""
+import itertools
+import math
+import operator
+
+import numpy as np
+
+import random_streams
+
+# reservoir_sample holds count / DENSE_FRACTION items before switching to
+# Algorithm L, so streams it keeps more of are picked with sample_indices
+DENSE_FRACTION = 0.25
+# How many uniform values reservoir_sample draws from numpy at a time
+UNIFORM_BATCH = 4096
+
+
+def keep_count(total, percent):
+    """Returns how many of total items a percentage keeps
+
+    Rounds the same way the scatter tool always has, by truncating the
+    number of items to remove.
+    """
+    percent = min(max(percent, 0), 100)
+    return total - int((float(100 - percent) / 100) * total)
+
+
+def sample_indices(total, count, seed=None):
+    """Returns count sorted indices picked uniformly from range(total)
+
+    Every index gets a fixed random key from the seed and the count
+    lowest keys are kept with a partition, so it runs in O(total) time
+    and raising count only ever adds indices to the previous pick.
+    """
+    if count >= total:
+        return np.arange(total)
+    if count <= 0:
+        return np.empty(0, dtype=np.int64)
+    keys = random_streams.block_uniform(seed, random_streams.SAMPLE, 0,
+                                        total)[:, 0]
+    indices = np.argpartition(keys, count)[:count]
+    indices.sort()
+    return indices
+
+
+def weighted_indices(weights, count, seed=None):
+    """Returns count sorted indices picked without replacement by weight
+
+    Indices with a weight of 0 or less are never picked. The weighted
+    keys of Efraimidis and Spirakis are only drawn for the remaining
+    candidates and the largest count of them found with a partition, so
+    this is O(n + k) however much of the weights are masked out. Keys
+    are drawn per index, so a pick changes only where weights or count
+    did.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    candidates = np.flatnonzero(weights > 0.0)
+    if count >= len(candidates):
+        return candidates
+    if count <= 0:
+        return np.empty(0, dtype=np.int64)
+    uniform = random_streams.indexed_uniform(seed, random_streams.WEIGHTS,
+                                             candidates)[:, 0]
+    keys = np.log(uniform) / weights[candidates]
+    picked = np.argpartition(keys, len(keys) - count)[len(keys) - count:]
+    indices = candidates[picked]
+    indices.sort()
+    return indices
+
+
+def reservoir_sample(items, count, seed=None):
+    """Picks count items from an iterable of unknown length in one pass
+
+    Only the picked items are ever held in memory, so items can be a
+    generator of vertex names or indices. The picked items are returned
+    in the order they came out of the iterable.
+
+    The first count / DENSE_FRACTION items are held and picked from with
+    sample_indices, so a stream that ends within them, where Algorithm L
+    would swap nearly every item, costs one vectorized pick. Longer
+    streams carry on with Algorithm L from that pick's largest key.
+    """
+    if count <= 0:
+        return []
+    seed = random_streams.resolve(seed)
+    iterator = iter(items)
+    limit = int(math.ceil(count / DENSE_FRACTION))
+    head = list(itertools.islice(iterator, limit))
+    if len(head) < limit:
+        return [head[index] for index in
+                sample_indices(len(head), count, seed).tolist()]
+    # The same keys sample_indices gives the head, whose count smallest
+    # are a uniform pick with the largest of them as Algorithm L's weight
+    keys = random_streams.block_uniform(seed, random_streams.SAMPLE, 0,
+                                        limit)[:, 0]
+    kept = np.sort(np.argpartition(keys, count - 1)[:count])
+    weight = float(keys[kept].max())
+    reservoir = [(index, head[index]) for index in kept.tolist()]
+    del head
+    uniform = _uniforms(random_streams.stream(seed, random_streams.SAMPLE))
+    pairs = enumerate(iterator, limit)
+    # Algorithm L: skip ahead geometrically instead of rolling per item,
+    # islice does the skipping without running python code per item
+    while weight < 1.0:
+        skip = _skip(next(uniform), weight)
+        if skip is None:
+            break
+        pair = next(itertools.islice(pairs, skip, None), None)
+        if pair is None:
+            break
+        reservoir[min(int(next(uniform) * count), count - 1)] = pair
+        weight *= math.exp(math.log(next(uniform)) / count)
+    reservoir.sort(key=operator.itemgetter(0))
+    return [item for _, item in reservoir]
+
+
+def _uniforms(rng):
+    """Yields python floats in (0, 1], drawn from rng in batches"""
+    while True:
+        for value in rng.random(UNIFORM_BATCH).tolist():
+            yield 1.0 - value
+
+
+def _skip(uniform, weight):
+    """Returns how many items Algorithm L skips, None for no more swaps"""
+    if weight <= 0.0:
+        return None
+    return int(math.floor(math.log(uniform) / math.log1p(-weight)))
@@ -1,19 +1,37 @@
 import logging
-import random
 from PySide2 import QtWidgets, QtCore
 from PySide2.QtCore import Qt
 from shiboken2 import wrapInstance
 import maya.OpenMayaUI as omui
 import maya.cmds as cmds
 
-random.seed(1)
+import geometry
+import instrument
+import placement
+import point_cache
+import random_streams
+import rescatter
+import scatter_job
+import scatter_output
+import scatter_preview
+import weight_maps
+
 log = logging.getLogger(__name__)
 
+VERTEX_MODE = placement.VERTEX_MODE
+SURFACE_MODE = placement.SURFACE_MODE
+BAKED_ALIGN = "Computed"
+CONSTRAINT_ALIGN = "Bake Constraints"
+CHUNK_SIZE = 1000
+# How long the options have to stay unchanged before the preview redraws
+PREVIEW_DELAY_MS = 80
+CACHE_FILTER = "Scatter Point Cache (*{})".format(point_cache.EXTENSION)
+
 
 def maya_main_window():
     """Return the maya main window widget"""
     main_window = omui.MQtUtil.mainWindow()
-    return wrapInstance(long(main_window), QtWidgets.QWidget)
+    return wrapInstance(int(main_window), QtWidgets.QWidget)
 
 
 class ScatterToolUI(QtWidgets.QDialog):
@@ -23,7 +41,12 @@ class ScatterToolUI(QtWidgets.QDialog):
         self.setWindowTitle("ScatterTool")
         self.setMinimumWidth(425)
         self.setMinimumHeight(350)
+        self.placer = placement.IncrementalPlacement()
+        self.preview = scatter_preview.ScatterPreview(self.placer)
+        self._preview_geometry = None
+        self._preview_key = None
         self.create_ui()
+        self.preview_timer = self.preview_timer_setup()
         self.connection()
 
     def create_ui(self):
@@ -34,6 +57,11 @@ class ScatterToolUI(QtWidgets.QDialog):
         destination_lay = self._destination_ui()
         align_lay = self._align_normals_ui()
         scat_verts_lay = self._scatter_verts_onto_ui()
+        scatter_mode_lay = self._scatter_mode_ui()
+        spacing_lay = self._min_distance_ui()
+        density_lay = self._density_ui()
+        output_lay = self._output_ui()
+        cache_lay = self._cache_ui()
         funky_lay = self._funky_mode_ui()
         displace_rotate_lay = self._displacement_rotation_ui()
         displace_scale_lay = self._displacement_scale_ui()
@@ -42,13 +70,16 @@ class ScatterToolUI(QtWidgets.QDialog):
                                         displace_rotate_lay,
                                         displace_scale_lay, scatter_lay,
                                         title_lbl, align_lay,
-                                        scat_verts_lay, funky_lay)
+                                        scat_verts_lay, funky_lay,
+                                        scatter_mode_lay, spacing_lay,
+                                        density_lay, output_lay, cache_lay)
         self.setLayout(main_lay)
 
     def main_lay_layout(self, apply_cancel_lay, destination_lay,
                         displace_rotate_lay, displace_scale_lay,
                         scatter_lay, title_lbl, align_lay, scat_verts_lay,
-                        funky_lay):
+                        funky_lay, scatter_mode_lay, spacing_lay,
+                        density_lay, output_lay, cache_lay):
         """Organizes main ui widget layouts"""
         main_lay = QtWidgets.QVBoxLayout()
         main_lay.addWidget(title_lbl)
@@ -58,24 +89,50 @@ class ScatterToolUI(QtWidgets.QDialog):
         main_lay.addSpacing(20)
         main_lay.addLayout(align_lay)
         main_lay.addLayout(scat_verts_lay)
+        main_lay.addLayout(scatter_mode_lay)
+        main_lay.addLayout(spacing_lay)
+        main_lay.addLayout(density_lay)
         main_lay.addLayout(funky_lay)
         main_lay.addSpacing(20)
         main_lay.addLayout(displace_rotate_lay)
         main_lay.addSpacing(20)
         main_lay.addLayout(displace_scale_lay)
+        main_lay.addSpacing(20)
+        main_lay.addLayout(output_lay)
+        main_lay.addLayout(cache_lay)
         main_lay.addLayout(apply_cancel_lay)
         main_lay.addStretch()
         return main_lay
 
     def button_setup(self):
         """Creates Apply and Cancel buttons"""
+        self.preview_cbox = QtWidgets.QCheckBox("Live Preview")
+        self.rescatter_cbox = QtWidgets.QCheckBox("Update Existing")
+        self.rescatter_cbox.setToolTip(
+            "Update the last scatter of this object onto the destination "
+            "instead of making a new group")
         self.apply_btn = QtWidgets.QPushButton("Apply")
         self.cancel_btn = QtWidgets.QPushButton("Cancel")
         layout = QtWidgets.QHBoxLayout()
+        layout.addWidget(self.preview_cbox)
+        layout.addWidget(self.rescatter_cbox)
         layout.addWidget(self.apply_btn)
         layout.addWidget(self.cancel_btn)
         return layout
 
+    def _cache_ui(self):
+        """Creates the point cache export and import buttons"""
+        self.export_cache_btn = QtWidgets.QPushButton("Export Cache...")
+        self.export_cache_btn.setToolTip(
+            "Write the scatter the current options make to a point cache")
+        self.import_cache_btn = QtWidgets.QPushButton("Import Cache...")
+        self.import_cache_btn.setToolTip(
+            "Scatter the points of a cache with the picked output")
+        layout = QtWidgets.QHBoxLayout()
+        layout.addWidget(self.export_cache_btn)
+        layout.addWidget(self.import_cache_btn)
+        return layout
+
     def slider_setup(self):
         """Setup for creating sliders"""
         slider = QtWidgets.QSlider()
@@ -101,8 +158,11 @@ class ScatterToolUI(QtWidgets.QDialog):
         align_lbl = QtWidgets.QLabel("Align to Normals: ")
         align_lbl.setFixedWidth(125)
         self.align_normals_cbox = QtWidgets.QCheckBox()
+        self.align_mode_cmb = QtWidgets.QComboBox()
+        self.align_mode_cmb.addItems([BAKED_ALIGN, CONSTRAINT_ALIGN])
         layout.addWidget(align_lbl)
         layout.addWidget(self.align_normals_cbox)
+        layout.addWidget(self.align_mode_cmb)
         return layout
 
     def _scatter_verts_onto_ui(self):
@@ -117,6 +177,74 @@ class ScatterToolUI(QtWidgets.QDialog):
         self._add_scatter_verts_widgets(layout, percent_lbl, verts_lbl)
         return layout
 
+    def _scatter_mode_ui(self):
+        """The ui for choosing between vertex and surface scattering"""
+        layout = QtWidgets.QHBoxLayout()
+        mode_lbl = QtWidgets.QLabel("Scatter onto: ")
+        mode_lbl.setFixedWidth(125)
+        self.scatter_mode_cmb = QtWidgets.QComboBox()
+        self.scatter_mode_cmb.addItems([VERTEX_MODE, SURFACE_MODE])
+        points_lbl = QtWidgets.QLabel("Surface points: ")
+        self.surface_points_sbx = QtWidgets.QSpinBox()
+        self.surface_points_sbx.setRange(1, 10000000)
+        self.surface_points_sbx.setValue(100)
+        layout.addWidget(mode_lbl)
+        layout.addWidget(self.scatter_mode_cmb)
+        layout.addWidget(points_lbl)
+        layout.addWidget(self.surface_points_sbx)
+        return layout
+
+    def _min_distance_ui(self):
+        """The ui for the minimum distance between instances"""
+        layout = QtWidgets.QHBoxLayout()
+        distance_lbl = QtWidgets.QLabel("Min distance: ")
+        distance_lbl.setFixedWidth(125)
+        self.min_distance_le = QtWidgets.QLineEdit("0")
+        self.min_distance_le.setFixedWidth(50)
+        layout.addWidget(distance_lbl)
+        layout.addWidget(self.min_distance_le)
+        layout.addStretch()
+        return layout
+
+    def _density_ui(self):
+        """The ui for the weight map that drives scatter density"""
+        layout = QtWidgets.QHBoxLayout()
+        density_lbl = QtWidgets.QLabel("Density: ")
+        density_lbl.setFixedWidth(125)
+        self.density_cmb = QtWidgets.QComboBox()
+        self.density_cmb.addItems(list(weight_maps.KINDS))
+        low_lbl = QtWidgets.QLabel("Low: ")
+        self.density_low_le = QtWidgets.QLineEdit("0")
+        self.density_low_le.setFixedWidth(50)
+        high_lbl = QtWidgets.QLabel("High: ")
+        self.density_high_le = QtWidgets.QLineEdit("1")
+        self.density_high_le.setFixedWidth(50)
+        frequency_lbl = QtWidgets.QLabel("Frequency: ")
+        self.noise_frequency_le = QtWidgets.QLineEdit("0.1")
+        self.noise_frequency_le.setFixedWidth(50)
+        self.density_invert_cbox = QtWidgets.QCheckBox("Invert")
+        layout.addWidget(density_lbl)
+        layout.addWidget(self.density_cmb)
+        layout.addWidget(low_lbl)
+        layout.addWidget(self.density_low_le)
+        layout.addWidget(high_lbl)
+        layout.addWidget(self.density_high_le)
+        layout.addWidget(frequency_lbl)
+        layout.addWidget(self.noise_frequency_le)
+        layout.addWidget(self.density_invert_cbox)
+        return layout
+
+    def _output_ui(self):
+        """The ui for choosing what the scatter creates"""
+        layout = QtWidgets.QHBoxLayout()
+        output_lbl = QtWidgets.QLabel("Output: ")
+        output_lbl.setFixedWidth(125)
+        self.output_cmb = QtWidgets.QComboBox()
+        self.output_cmb.addItems(list(scatter_output.OUTPUTS))
+        layout.addWidget(output_lbl)
+        layout.addWidget(self.output_cmb)
+        return layout
+
     def _add_scatter_verts_widgets(self, layout, percent_lbl, verts_lbl):
         layout.addWidget(verts_lbl)
         layout.addWidget(self.verts_le)
@@ -256,9 +384,15 @@ class ScatterToolUI(QtWidgets.QDialog):
         """Randomizes the options"""
         self.funky_lbl = QtWidgets.QLabel("Funky Mode? ")
         self.funky_btn = QtWidgets.QPushButton("Randomize Settings")
+        seed_lbl = QtWidgets.QLabel("Seed: ")
+        self.seed_sbx = QtWidgets.QSpinBox()
+        self.seed_sbx.setRange(0, 2 ** 31 - 1)
+        self.seed_sbx.setValue(1)
         layout = QtWidgets.QHBoxLayout()
         layout.addWidget(self.funky_lbl)
         layout.addWidget(self.funky_btn)
+        layout.addWidget(seed_lbl)
+        layout.addWidget(self.seed_sbx)
         return layout
 
     def connection(self):
@@ -268,38 +402,120 @@ class ScatterToolUI(QtWidgets.QDialog):
         self.apply_btn.clicked.connect(self.scatter_objects)
         self.cancel_btn.clicked.connect(self.cancel_window)
         self.funky_btn.clicked.connect(self.funky_mode)
+        self.preview_cbox.toggled.connect(self.toggle_preview)
+        self.export_cache_btn.clicked.connect(self.export_cache)
+        self.import_cache_btn.clicked.connect(self.import_cache)
+        self._preview_connection()
+
+    def _preview_connection(self):
+        """Schedules a preview redraw whenever any option changes"""
+        for line_edit in (self.scatter_le, self.dest_le, self.verts_le,
+                          self.min_distance_le, self.density_low_le,
+                          self.density_high_le, self.noise_frequency_le,
+                          self.x_rotate_value_le, self.y_rotate_value_le,
+                          self.z_rotate_value_le, self.x_min_value_le,
+                          self.y_min_value_le, self.z_min_value_le,
+                          self.x_max_value_le, self.y_max_value_le,
+                          self.z_max_value_le):
+            line_edit.textChanged.connect(self.schedule_preview)
+        for spin_box in (self.surface_points_sbx, self.seed_sbx):
+            spin_box.valueChanged.connect(self.schedule_preview)
+        for combo_box in (self.scatter_mode_cmb, self.density_cmb):
+            combo_box.currentIndexChanged.connect(self.schedule_preview)
+        for check_box in (self.align_normals_cbox, self.density_invert_cbox):
+            check_box.toggled.connect(self.schedule_preview)
+
+    def preview_timer_setup(self):
+        """Creates the timer that debounces preview redraws"""
+        timer = QtCore.QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(PREVIEW_DELAY_MS)
+        timer.timeout.connect(self.update_preview)
+        return timer
+
+    @QtCore.Slot()
+    def schedule_preview(self):
+        """Restarts the debounce timer, so a slider drag redraws once"""
+        if self.preview_cbox.isChecked():
+            self.preview_timer.start()
+
+    @QtCore.Slot(bool)
+    def toggle_preview(self, checked):
+        """Shows the preview, reading the destination again, or hides it"""
+        if checked:
+            self._preview_key = None
+            self.update_preview()
+        else:
+            self.preview_timer.stop()
+            self.preview.clear()
+
+    @QtCore.Slot()
+    def update_preview(self):
+        """Redraws the preview, only recomputing what changed"""
+        scatter_name = self.scatter_le.text()
+        if not (self.preview_cbox.isChecked() and
+                getattr(self, "dest_obj", None) and
+                cmds.objExists(scatter_name)):
+            return
+        try:
+            settings = self.scatter_settings()
+        except ValueError:
+            # An option is still being typed in
+            return
+        self.preview.update(scatter_name, self.preview_geometry(), settings)
+
+    def preview_geometry(self):
+        """Returns the destination geometry, read once per destination"""
+        key = (tuple(self.dest_obj), self.density_cmb.currentText())
+        if key != self._preview_key:
+            self._preview_geometry = self.destination_geometry(
+                cmds.polyListComponentConversion(self.dest_obj,
+                                                 toVertex=True))
+            self._preview_key = key
+        return self._preview_geometry
+
+    def closeEvent(self, event):
+        self.preview_cbox.setChecked(False)
+        super(ScatterToolUI, self).closeEvent(event)
 
     @QtCore.Slot()
     def funky_mode(self):
-        self.verts_le.setText(str(int(random.uniform(0, 100))))
-        self.x_rotate_value_le.setText(str(int(random.uniform(0, 360))))
-        self.y_rotate_value_le.setText(str(int(random.uniform(0, 360))))
-        self.z_rotate_value_le.setText(str(int(random.uniform(0, 360))))
+        """Picks a new seed and randomizes the options from it"""
+        self.seed_sbx.setValue(random_streams.new_seed())
+        self.funky_rng = random_streams.stream(self.seed_sbx.value(),
+                                               random_streams.FUNKY)
+        self.verts_le.setText(str(int(self.funky_rng.uniform(0, 100))))
+        self.x_rotate_value_le.setText(str(int(self.funky_rng.uniform
+                                               (0, 360))))
+        self.y_rotate_value_le.setText(str(int(self.funky_rng.uniform
+                                               (0, 360))))
+        self.z_rotate_value_le.setText(str(int(self.funky_rng.uniform
+                                               (0, 360))))
         self._align_normals_randomize()
         self._scale_randomize()
 
     def _scale_randomize(self):
-        self.x_min_value_le.setText(str(int(random.uniform(1, 5))))
+        self.x_min_value_le.setText(str(int(self.funky_rng.uniform(1, 5))))
         self.x_max_value_le.setText(str(self.max_rand
                                         (self.x_min_value_le.text())))
-        self.y_min_value_le.setText(str(int(random.uniform(1, 5))))
+        self.y_min_value_le.setText(str(int(self.funky_rng.uniform(1, 5))))
         self.y_max_value_le.setText(str(self.max_rand
                                         (self.y_min_value_le.text())))
-        self.z_min_value_le.setText(str(int(random.uniform(1, 5))))
+        self.z_min_value_le.setText(str(int(self.funky_rng.uniform(1, 5))))
         self.z_max_value_le.setText(str(self.max_rand
                                         (self.z_min_value_le.text())))
 
     def _align_normals_randomize(self):
-        if (int(random.uniform(0, 2))) == 0:
+        if (int(self.funky_rng.uniform(0, 2))) == 0:
             self.align_normals_cbox.setChecked(True)
         else:
             self.align_normals_cbox.setChecked(False)
 
     def max_rand(self, min_rand):
         min_rand = int(min_rand)
-        max_rand = int(random.uniform(0, 8))
+        max_rand = int(self.funky_rng.uniform(0, 8))
         while max_rand <= min_rand:
-            max_rand = (int(random.uniform(0, 8)))
+            max_rand = (int(self.funky_rng.uniform(0, 8)))
         return max_rand
 
     @QtCore.Slot()
@@ -324,23 +540,39 @@ class ScatterToolUI(QtWidgets.QDialog):
 
     def scatter_objects(self):
         """Scatters the scatter object onto the destination object"""
+        with instrument.span("scatter.scatter_objects",
+                             scatter=self.scatter_le.text()):
+            self._scatter_objects()
+
+    def _scatter_objects(self):
         scatter_name = self.scatter_le.text()
         dest_name = self.dest_le.text()
 
         if cmds.objExists(scatter_name) & cmds.objExists(self.dest_obj[0]):
             if cmds.objectType(scatter_name) == "transform":
 
-                vertex_names = cmds.polyListComponentConversion \
+                vertices = cmds.polyListComponentConversion \
                     (self.dest_obj, toVertex=True)
-                vertex_names = cmds.filterExpand(vertex_names,
-                                                 selectionMask=31)
-
-                cmds.select(vertex_names)
 
-                instance_group = cmds.group(empty=True,
-                                            name=scatter_name +
-                                                 '_instance_grp#', )
-                self.scatter_loop(instance_group, scatter_name, vertex_names)
+                cmds.select(vertices)
+
+                self.preview_cbox.setChecked(False)
+                with instrument.span("scatter.read_geometry") as span:
+                    dest_geometry = self.destination_geometry(vertices)
+                    span.set(vertices=len(dest_geometry))
+                existing_group = None
+                if self.rescatter_cbox.isChecked():
+                    existing_group = rescatter.find_group(scatter_name,
+                                                          self.dest_obj)
+                if existing_group:
+                    self.rescatter_group(existing_group, dest_geometry)
+                    return
+                with scatter_job.undo_chunk("scatter " + scatter_name):
+                    instance_group = cmds.group(empty=True,
+                                                name=scatter_name +
+                                                     '_instance_grp#', )
+                    self.scatter_loop(instance_group, scatter_name,
+                                      dest_geometry)
 
             else:
                 cmds.error(scatter_name + " is not a Transform object")
@@ -348,52 +580,217 @@ class ScatterToolUI(QtWidgets.QDialog):
             cmds.error("Couldn't find '" + scatter_name + "' or '"
                        + dest_name + "' object.")
 
-    def scatter_loop(self, instance_group, scatter_name, vertex_names):
-        """The loop for scattering the scatter object onto each vertex"""
-        vertex_names = self.percentage_to_spread_onto(vertex_names)
-        for vertex in vertex_names:
-            new_instance = cmds.instance(scatter_name,
-                                         name=scatter_name +
-                                              '_instance#',
-                                         smartTransform=True)
-            cmds.parent(new_instance, instance_group)
-            position = cmds.pointPosition(vertex, world=True)
-            cmds.move(position[0], position[1], position[2],
-                      new_instance)
-            self.scatter_rotate_scale(new_instance)
-            if self.align_normals_cbox.isChecked():
-                cmds.normalConstraint([vertex], new_instance,
-                                      aimVector=[0.0, 1.0, 0.0])
+    def destination_geometry(self, vertices):
+        """Reads the destination vertices, with colors when needed"""
+        color_set = None
+        if self.density_cmb.currentText() == weight_maps.COLOR:
+            color_set = ""
+        return geometry.MayaMeshSource(vertices, color_set=color_set)
+
+    @instrument.timed("scatter.scatter_loop")
+    def scatter_loop(self, instance_group, scatter_name, dest_geometry):
+        """The loop for scattering the scatter object onto each point"""
+        settings = self.scatter_settings()
+        align_mode = None
+        if self.align_normals_cbox.isChecked():
+            align_mode = self.align_mode_cmb.currentText()
+        output = scatter_output.OUTPUTS[self.output_cmb.currentText()](cmds)
+        if align_mode == CONSTRAINT_ALIGN and not isinstance(
+                output, scatter_output.TransformsOutput):
+            # Only transform nodes can be constrained
+            align_mode = BAKED_ALIGN
+        settings.align = align_mode == BAKED_ALIGN
+        with instrument.span("scatter.placement") as span:
+            scatter = self.placer.update(dest_geometry, settings)
+            span.set(instances=len(scatter),
+                     recomputed=self.placer.recomputed)
+        job = scatter_job.ScatterJob(output, scatter_name, instance_group,
+                                     scatter.transforms, chunk_size=CHUNK_SIZE,
+                                     progress_callback=self.update_progress,
+                                     cmds=cmds)
+        self.progress_dlg = self.progress_dialog_setup(len(scatter))
+        self.progress_dlg.canceled.connect(job.cancel)
+        with instrument.span("scatter.write", output=output.name,
+                             instances=len(scatter)):
+            created = job.run()
+        self.progress_dlg.close()
+        if job.cancelled:
+            cmds.delete(instance_group)
+            return
+        if align_mode == CONSTRAINT_ALIGN:
+            with instrument.span("scatter.bake_constraints"):
+                self.bake_normal_constraints(created, dest_geometry,
+                                             scatter.vertex_ids)
+            # Updates align with the computed rotations the bake matches
+            settings.align = True
+        rescatter.record_scatter(instance_group, scatter_name, self.dest_obj,
+                                 output, settings, dest_geometry, scatter,
+                                 created, cmds)
+
+    def rescatter_group(self, instance_group, dest_geometry):
+        """Updates only the instances of a previous scatter that changed"""
+        record = rescatter.ScatterRecord.read(instance_group, cmds)
+        output = scatter_output.OUTPUTS[self.output_cmb.currentText()](cmds)
+        updater = rescatter.Rescatter(instance_group, record, cmds)
+        updater.run(dest_geometry, self.scatter_settings(), output)
+
+    @QtCore.Slot()
+    def export_cache(self):
+        """Writes the scatter the current options make to a point cache"""
+        scatter_name = self.scatter_le.text()
+        if not getattr(self, "dest_obj", None):
+            cmds.error("Pick a destination object to export from.")
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Export Point Cache", scatter_name + point_cache.EXTENSION,
+            CACHE_FILTER)
+        if not path:
+            return
+        settings = self.scatter_settings()
+        with instrument.span("scatter.export_cache") as span:
+            # Read fresh, the preview's copy may predate mesh edits
+            dest_geometry = self.destination_geometry(
+                cmds.polyListComponentConversion(self.dest_obj,
+                                                 toVertex=True))
+            scatter = self.placer.update(dest_geometry, settings)
+            point_cache.write(path, scatter.transforms, ids=scatter.ids,
+                              sources=[scatter_name], seed=settings.seed,
+                              settings=settings.to_dict())
+            span.set(instances=len(scatter))
+
+    @QtCore.Slot()
+    def import_cache(self):
+        """Scatters the points of a cache into new instance groups
+
+        Every scatter object the cache was made from gets its own group,
+        written by the picked output straight from the mapped file.
+        """
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Import Point Cache", "", CACHE_FILTER)
+        if not path:
+            return
+        with point_cache.PointCache(path) as cache:
+            source_ids = cache.column("source_ids")
+            for source_id, scatter_name in enumerate(cache.sources):
+                if not cmds.objExists(scatter_name):
+                    cmds.warning("Skipping the points of missing object '" +
+                                 scatter_name + "'")
+                    continue
+                transforms = cache.transforms()
+                if len(cache.sources) > 1:
+                    transforms = transforms[source_ids == source_id]
+                self.import_transforms(scatter_name, transforms)
+
+    def import_transforms(self, scatter_name, transforms):
+        """Writes transforms of scatter_name into a new instance group"""
+        output = scatter_output.OUTPUTS[self.output_cmb.currentText()](cmds)
+        with scatter_job.undo_chunk("import " + scatter_name), \
+                instrument.span("scatter.import_cache", output=output.name,
+                                instances=len(transforms)):
+            instance_group = cmds.group(empty=True,
+                                        name=scatter_name + '_instance_grp#')
+            job = scatter_job.ScatterJob(
+                output, scatter_name, instance_group, transforms,
+                chunk_size=CHUNK_SIZE, progress_callback=self.update_progress,
+                cmds=cmds)
+            self.progress_dlg = self.progress_dialog_setup(len(transforms))
+            self.progress_dlg.canceled.connect(job.cancel)
+            job.run()
+            self.progress_dlg.close()
+            if job.cancelled:
+                cmds.delete(instance_group)
+
+    def progress_dialog_setup(self, total):
+        """Creates the progress dialog shown while scattering"""
+        progress_dlg = QtWidgets.QProgressDialog("Scattering...", "Cancel",
+                                                 0, total, self)
+        progress_dlg.setWindowModality(Qt.WindowModal)
+        progress_dlg.setMinimumDuration(0)
+        return progress_dlg
+
+    def update_progress(self, job):
+        """Shows scatter progress and throughput, lets cancel be clicked"""
+        self.progress_dlg.setValue(job.done)
+        self.progress_dlg.setLabelText(
+            "Scattering... {:.0f} instances/s".format(
+                job.instances_per_second))
+        QtWidgets.QApplication.processEvents()
+
+    def bake_normal_constraints(self, instances, dest_geometry, vertex_ids):
+        """Aligns instances with temporary normal constraints
+
+        Every constraint is created first, then the evaluated rotations
+        are read back and all constraints are deleted in one call, so no
+        constraint nodes are left in the scene.
+        """
+        constraints = []
+        for index, new_instance in enumerate(instances):
+            if vertex_ids is None:
+                target = dest_geometry.meshes
+            else:
+                target = dest_geometry.vertex_name(vertex_ids[index])
+            constraints.extend(cmds.normalConstraint(
+                target, new_instance, aimVector=[0.0, 1.0, 0.0]))
+        rotations = [cmds.xform(new_instance, query=True, rotation=True)
+                     for new_instance in instances]
+        if constraints:
+            cmds.delete(constraints)
+        for new_instance, rotation in zip(instances, rotations):
+            cmds.xform(new_instance, rotation=rotation)
 
     def percentage_to_spread_onto(self, vertex_names):
-        """Deletes a percentage of vertexes from vertex list"""
-        percent_to_delete = 100 - int(self.verts_le.text())
-        num_in_list = len(vertex_names)
-        num_to_delete = int((float(percent_to_delete) / 100) * num_in_list)
-        while num_to_delete != 0:
-            random_value = int(random.uniform(0, (len(vertex_names) - 1)))
-            vertex_names.pop(random_value)
-            num_to_delete = num_to_delete - 1
-        return vertex_names
-
-    def scatter_rotate_scale(self, new_instance):
-        """Generates random variables for rotate and scale"""
-        x_rotate = random.uniform(0, int(self.x_rotate_value_le.text()))
-        y_rotate = random.uniform(0, int(self.y_rotate_value_le.text()))
-        z_rotate = random.uniform(0, int(self.z_rotate_value_le.text()))
-        cmds.rotate(x_rotate, y_rotate, z_rotate, new_instance)
-        x_scale = random.uniform(int(self.x_min_value_le.text()),
-                                 int(self.x_max_value_le.text()))
-        y_scale = random.uniform(int(self.y_min_value_le.text()),
-                                 int(self.y_max_value_le.text()))
-        z_scale = random.uniform(int(self.z_min_value_le.text()),
-                                 int(self.z_max_value_le.text()))
-        cmds.scale(x_scale, y_scale, z_scale, new_instance)
+        """Keeps a random percentage of vertexes from vertex list"""
+        return placement.keep_percentage(vertex_names,
+                                         int(self.verts_le.text()),
+                                         self.seed_sbx.value())
+
+    def scatter_settings(self):
+        """Reads every scatter option from the ui once"""
+        rotate_max, scale_min, scale_max = self.rotate_scale_ranges()
+        return placement.ScatterSettings(
+            mode=self.scatter_mode_cmb.currentText(),
+            percent=int(self.verts_le.text()),
+            surface_points=self.surface_points_sbx.value(),
+            min_distance=float(self.min_distance_le.text()),
+            rotate_max=rotate_max, scale_min=scale_min, scale_max=scale_max,
+            align=self.align_normals_cbox.isChecked(),
+            seed=self.seed_sbx.value(), weight_map=self.weight_map())
+
+    def weight_map(self):
+        """Returns the WeightMap picked in the ui, or None"""
+        kind = self.density_cmb.currentText()
+        if kind == weight_maps.NO_WEIGHTS:
+            return None
+        return weight_maps.WeightMap(
+            kind, low=float(self.density_low_le.text()),
+            high=float(self.density_high_le.text()),
+            frequency=float(self.noise_frequency_le.text()),
+            invert=self.density_invert_cbox.isChecked())
+
+    def rotate_scale_ranges(self):
+        """Reads the rotate and scale ranges from the ui once"""
+        rotate_max = (int(self.x_rotate_value_le.text()),
+                      int(self.y_rotate_value_le.text()),
+                      int(self.z_rotate_value_le.text()))
+        scale_min = (int(self.x_min_value_le.text()),
+                     int(self.y_min_value_le.text()),
+                     int(self.z_min_value_le.text()))
+        scale_max = (int(self.x_max_value_le.text()),
+                     int(self.y_max_value_le.text()),
+                     int(self.z_max_value_le.text()))
+        return rotate_max, scale_min, scale_max
 
     def cancel_window(self):
         """Closes UI"""
-        ui.close()
+        self.close()
+
+
+def show():
+    """Creates and shows the scatter tool"""
+    global ui
+    ui = ScatterToolUI()
+    ui.show()
+    return ui
 
 
-ui = ScatterToolUI()
-ui.show()
+if __name__ == "__main__":
+    show()
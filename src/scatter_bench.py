@@ -0,0 +1,313 @@
+"""Benchmark harness for the scatter tool, run against a recording cmds.
+
+Every stage of a scatter is timed over synthetic meshes and reported
+as json with the host commands it called. Given a baseline report it
+exits with 1 when a stage got slower than the tolerance allows or made
+more host calls, so it can gate changes::
+
+    python scatter_bench.py --output baseline.json
+    python scatter_bench.py --baseline baseline.json
+
+ScatterToolUI.scatter_loop and percentage_to_spread_onto are always
+driven headless. Outside Maya, scatter.py is imported against stand-in
+PySide2, shiboken2 and maya modules, which only have to satisfy its
+import time names as every command goes to the recording cmds.
+"""
+import argparse
+import json
+import math
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+import numpy as np
+
+import geometry
+import mock_cmds
+import placement
+import scatter_output
+
+SIZES = (1000, 10000, 100000, 1000000)
+SCATTER_NAME = "benchRock"
+
+
+def synthetic_mesh(vertex_count):
+    """Returns a square plane with about vertex_count vertices"""
+    side = max(2, int(round(math.sqrt(vertex_count))))
+    return geometry.MockMeshSource.plane(side, side)
+
+
+HOST_MODULES = ("PySide2", "PySide2.QtWidgets", "PySide2.QtCore",
+                "shiboken2", "maya", "maya.OpenMayaUI", "maya.cmds")
+
+
+class _HostStub(object):
+    """Stands in for any Qt or Maya name scatter.py uses on import
+
+    It can be subclassed, like QDialog, and called as a decorator
+    factory, like QtCore.Slot(bool), which hands the function back.
+    """
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return self
+
+    def __getattr__(self, name):
+        return _HostStub()
+
+
+def _stub_module(name):
+    module = types.ModuleType(name)
+    module.__getattr__ = lambda attribute: _HostStub
+    return module
+
+
+def load_scatter_ui():
+    """Returns the scatter module and which host modules it was given
+
+    scatter.py is imported with Maya's own modules when they're there,
+    with stand-ins otherwise. The stand-ins are taken out of sys.modules
+    again so nothing else picks them up.
+    """
+    try:
+        import scatter
+        return scatter, "maya"
+    except ImportError:
+        pass
+    added = [name for name in HOST_MODULES if name not in sys.modules]
+    for name in added:
+        sys.modules[name] = _stub_module(name)
+        package, _, child = name.rpartition(".")
+        if package:
+            setattr(sys.modules[package], child, sys.modules[name])
+    try:
+        sys.modules.pop("scatter", None)
+        import scatter
+    finally:
+        for name in added:
+            sys.modules.pop(name, None)
+    return scatter, "stand-ins"
+
+
+class _Widget(object):
+    """Stands in for a line edit, spin, combo or check box"""
+
+    def __init__(self, value):
+        self._value = value
+
+    def text(self):
+        return str(self._value)
+
+    def value(self):
+        return self._value
+
+    def isChecked(self):
+        return bool(self._value)
+
+    def currentText(self):
+        return str(self._value)
+
+
+class _Signal(object):
+    def connect(self, slot):
+        pass
+
+
+class _ProgressDialog(object):
+    canceled = _Signal()
+
+    def setValue(self, value):
+        pass
+
+    def setLabelText(self, text):
+        pass
+
+    def close(self):
+        pass
+
+
+class HeadlessScatterTool(object):
+    """Just enough ScatterToolUI state to run its scatter methods
+
+    The methods themselves are ScatterToolUI's, called with this object
+    as self, so no Qt widgets or main window are needed.
+    """
+
+    def __init__(self, ui_module, cmds, settings, output_name, dest_obj):
+        self.ui_module = ui_module
+        self.cmds = cmds
+        self.settings = settings
+        self.verts_le = _Widget(settings.percent)
+        self.seed_sbx = _Widget(settings.seed)
+        self.align_normals_cbox = _Widget(settings.align)
+        self.align_mode_cmb = _Widget(ui_module.BAKED_ALIGN)
+        self.output_cmb = _Widget(output_name)
+        self.dest_obj = dest_obj
+        self.placer = placement.IncrementalPlacement()
+
+    def scatter_settings(self):
+        # scatter_loop changes the align setting, so hand out a copy
+        return placement.ScatterSettings.from_dict(self.settings.to_dict())
+
+    def progress_dialog_setup(self, total):
+        return _ProgressDialog()
+
+    def update_progress(self, job):
+        pass
+
+    def percentage_to_spread_onto(self, vertex_names):
+        return self.ui_module.ScatterToolUI.percentage_to_spread_onto(
+            self, vertex_names)
+
+    def scatter_loop(self, instance_group, scatter_name, dest_geometry):
+        ui_module = self.ui_module
+        maya_cmds = ui_module.cmds
+        ui_module.cmds = self.cmds
+        try:
+            ui_module.ScatterToolUI.scatter_loop(
+                self, instance_group, scatter_name, dest_geometry)
+        finally:
+            ui_module.cmds = maya_cmds
+
+
+def _stage(stages, name, cmds, func, *args):
+    cmds.reset()
+    start = time.perf_counter()
+    result = func(*args)
+    stages[name] = {
+        "seconds": time.perf_counter() - start,
+        "host_calls": dict(cmds.calls),
+        "host_call_total": cmds.total_calls,
+        "simulated_host_seconds": cmds.simulated_seconds,
+    }
+    return result
+
+
+def run(sizes=SIZES, settings=None, output_name="Transforms",
+        latency=0.0001, sleep=False):
+    """Runs every stage at every size, returns the json ready report"""
+    settings = settings or placement.ScatterSettings(
+        percent=10, rotate_max=(0, 360, 0), scale_min=(1, 1, 1),
+        scale_max=(2, 2, 2))
+    ui_module, host_modules = load_scatter_ui()
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "driver": "ScatterToolUI",
+        "host_modules": host_modules,
+        "settings": settings.to_dict(),
+        "output": output_name,
+        "latency": latency,
+        "sizes": {},
+    }
+    # Point cache outputs write into the workspace, which is thrown away
+    workspace = tempfile.mkdtemp(prefix="scatter_bench")
+    try:
+        for size in sizes:
+            cmds = mock_cmds.RecordingCmds(latency=latency, sleep=sleep,
+                                           workspace_root=workspace)
+            stages = {}
+            source = _stage(stages, "mesh", cmds, synthetic_mesh, size)
+            indices = np.arange(len(source))
+            tool = HeadlessScatterTool(ui_module, cmds, settings, output_name,
+                                       [source.meshes[0]])
+            _stage(stages, "percentage_to_spread_onto", cmds,
+                   tool.percentage_to_spread_onto, indices)
+            points = _stage(stages, "sampling", cmds,
+                            placement.scatter_points, source, settings)
+            _stage(stages, "transforms", cmds, placement.place_points,
+                   settings, *points)
+            instance_group = cmds.group(empty=True,
+                                        name=SCATTER_NAME + "_instance_grp#")
+            _stage(stages, "scatter_loop", cmds, tool.scatter_loop,
+                   instance_group, SCATTER_NAME, source)
+            report["sizes"][str(size)] = {"vertices": len(source),
+                                          "instances": len(points[0]),
+                                          "stages": stages}
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+    return report
+
+
+def compare(report, baseline, tolerance=0.5, noise_seconds=0.01):
+    """Returns the regressions of report against a baseline report
+
+    A stage regresses when it takes over tolerance longer than in the
+    baseline, by more than noise_seconds, or calls the host more often.
+    """
+    failures = []
+    for size, results in report["sizes"].items():
+        base_results = baseline.get("sizes", {}).get(size)
+        if not base_results:
+            continue
+        for name, stage in results["stages"].items():
+            base = base_results["stages"].get(name)
+            if not base:
+                continue
+            slower = stage["seconds"] - base["seconds"]
+            if (stage["seconds"] > base["seconds"] * (1.0 + tolerance) and
+                    slower > noise_seconds):
+                failures.append("{} at {}: {:.4f}s, baseline {:.4f}s".format(
+                    name, size, stage["seconds"], base["seconds"]))
+            if stage["host_call_total"] > base["host_call_total"]:
+                failures.append("{} at {}: {} host calls, baseline {}".format(
+                    name, size, stage["host_call_total"],
+                    base["host_call_total"]))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="scatter_bench")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="vertex counts of the synthetic meshes")
+    parser.add_argument("--mode", default=placement.VERTEX_MODE,
+                        choices=(placement.VERTEX_MODE,
+                                 placement.SURFACE_MODE))
+    parser.add_argument("--percent", type=int, default=10,
+                        help="percent of vertices to scatter onto")
+    parser.add_argument("--surface-points", type=int, default=10000)
+    parser.add_argument("--min-distance", type=float, default=0.0)
+    parser.add_argument("--align", action="store_true")
+    parser.add_argument("--output-type", default="Transforms",
+                        choices=list(scatter_output.OUTPUTS))
+    parser.add_argument("--latency", type=float, default=0.0001,
+                        help="simulated seconds per host call")
+    parser.add_argument("--sleep", action="store_true",
+                        help="really wait out the simulated latency")
+    parser.add_argument("--output", help="write the report to this file")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown, 0.5 being 50%%")
+    args = parser.parse_args(argv)
+    settings = placement.ScatterSettings(
+        mode=args.mode, percent=args.percent,
+        surface_points=args.surface_points, min_distance=args.min_distance,
+        rotate_max=(0, 360, 0), scale_min=(1, 1, 1), scale_max=(2, 2, 2),
+        align=args.align)
+    report = run(args.sizes, settings, args.output_type, args.latency,
+                 args.sleep)
+    text = json.dumps(report, indent=1, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as report_file:
+            report_file.write(text)
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            failures = compare(report, json.load(baseline_file),
+                               args.tolerance)
+        for failure in failures:
+            sys.stderr.write("Regression: {}\n".format(failure))
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Maya independent math for computing scatter instance transforms."""
+import numpy as np
+
+import random_streams
+
+
+class ScatterTransforms(object):
+    """Translate, rotate and scale arrays for every scattered instance."""
+
+    def __init__(self, translate, rotate, scale):
+        self.translate = translate
+        self.rotate = rotate
+        self.scale = scale
+
+    def __len__(self):
+        return len(self.translate)
+
+    def __getitem__(self, index):
+        """Returns the transforms of a slice or index array of instances"""
+        return ScatterTransforms(self.translate[index], self.rotate[index],
+                                 self.scale[index])
+
+    def matrices(self):
+        """Returns an (n, 4, 4) array of Maya style row-vector matrices
+
+        Rotations are in degrees and composed in the default 'xyz'
+        rotate order, so each matrix matches what cmds.xform would build
+        from the same translate, rotate and scale values.
+        """
+        return compose_matrices(self.translate, self.rotate, self.scale)
+
+
+def rotation_matrices(rotate):
+    """Returns (n, 3, 3) row-vector rotation matrices for xyz degrees"""
+    radians = np.radians(np.asarray(rotate, dtype=np.float64))
+    cos = np.cos(radians)
+    sin = np.sin(radians)
+    cx, cy, cz = cos[:, 0], cos[:, 1], cos[:, 2]
+    sx, sy, sz = sin[:, 0], sin[:, 1], sin[:, 2]
+    matrices = np.empty((len(radians), 3, 3))
+    # Rx * Ry * Rz for row vectors, the same as Maya's 'xyz' rotate order
+    matrices[:, 0, 0] = cy * cz
+    matrices[:, 0, 1] = cy * sz
+    matrices[:, 0, 2] = -sy
+    matrices[:, 1, 0] = sx * sy * cz - cx * sz
+    matrices[:, 1, 1] = sx * sy * sz + cx * cz
+    matrices[:, 1, 2] = sx * cy
+    matrices[:, 2, 0] = cx * sy * cz + sx * sz
+    matrices[:, 2, 1] = cx * sy * sz - sx * cz
+    matrices[:, 2, 2] = cx * cy
+    return matrices
+
+
+def compose_matrices(translate, rotate, scale):
+    """Builds (n, 4, 4) matrices from translate, rotate and scale arrays"""
+    translate = np.asarray(translate, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+    matrices = np.zeros((len(translate), 4, 4))
+    matrices[:, :3, :3] = rotation_matrices(rotate) * scale[:, :, None]
+    matrices[:, 3, :3] = translate
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def compute_transforms(positions, rotate_max=(0, 0, 0), scale_min=(1, 1, 1),
+                       scale_max=(1, 1, 1), seed=None, start=0, ids=None):
+    """Computes the transforms of every instance in one batched call
+
+    positions is an (n, 3) array of world space points. Each instance
+    gets a random rotation between 0 and rotate_max degrees and a
+    random scale between scale_min and scale_max on every axis.
+    start is the index of the first position within the whole scatter,
+    so computing it in chunks gives the same result as one call.
+    ids can instead give every position its own stable index, such as
+    its vertex, so an instance keeps its random rotation and scale when
+    other points come and go.
+    """
+    translate = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    seed = random_streams.resolve(seed)
+    if ids is None:
+        stop = start + len(translate)
+        rotate_values = random_streams.block_uniform(
+            seed, random_streams.ROTATE, start, stop, 3)
+        scale_values = random_streams.block_uniform(
+            seed, random_streams.SCALE, start, stop, 3)
+    else:
+        rotate_values = random_streams.indexed_uniform(
+            seed, random_streams.ROTATE, ids, 3)
+        scale_values = random_streams.indexed_uniform(
+            seed, random_streams.SCALE, ids, 3)
+    rotate = rotate_values * np.asarray(rotate_max, dtype=np.float64)
+    scale_min = np.asarray(scale_min, dtype=np.float64)
+    scale_max = np.asarray(scale_max, dtype=np.float64)
+    scale = scale_min + scale_values * (scale_max - scale_min)
+    return ScatterTransforms(translate, rotate, scale)
+
+
+def normal_alignment_matrices(normals, aim=(0.0, 1.0, 0.0)):
+    """Returns (n, 3, 3) row-vector rotations that turn aim onto normals
+
+    Each matrix is the smallest rotation taking the aim axis to its
+    normal, so instances keep their twist around the aim axis.
+    """
+    aim = np.asarray(aim, dtype=np.float64)
+    aim = aim / np.linalg.norm(aim)
+    normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    # Zero length normals leave the instance unaligned
+    normals = np.where(lengths > 0.0,
+                       normals / np.where(lengths > 0.0, lengths, 1.0), aim)
+    axes = np.cross(aim, normals)
+    cosines = normals.dot(aim)
+    cross = np.zeros((len(normals), 3, 3))
+    cross[:, 0, 1] = -axes[:, 2]
+    cross[:, 0, 2] = axes[:, 1]
+    cross[:, 1, 0] = axes[:, 2]
+    cross[:, 1, 2] = -axes[:, 0]
+    cross[:, 2, 0] = -axes[:, 1]
+    cross[:, 2, 1] = axes[:, 0]
+    opposite = cosines < -1.0 + 1e-9
+    factors = 1.0 / np.where(opposite, 1.0, 1.0 + cosines)
+    matrices = (np.eye(3) + cross +
+                np.matmul(cross, cross) * factors[:, None, None])
+    if opposite.any():
+        # Half turn around any axis perpendicular to aim
+        perpendicular = np.cross(aim, [1.0, 0.0, 0.0])
+        if np.linalg.norm(perpendicular) < 1e-6:
+            perpendicular = np.cross(aim, [0.0, 0.0, 1.0])
+        perpendicular /= np.linalg.norm(perpendicular)
+        matrices[opposite] = (2.0 * np.outer(perpendicular, perpendicular) -
+                              np.eye(3))
+    # Rodrigues gives column-vector matrices, Maya multiplies rows
+    return np.transpose(matrices, (0, 2, 1))
+
+
+def euler_from_matrices(matrices):
+    """Returns (n, 3) xyz rotate order degrees of row-vector rotations"""
+    matrices = np.asarray(matrices, dtype=np.float64)
+    sin_y = np.clip(-matrices[:, 0, 2], -1.0, 1.0)
+    y = np.arcsin(sin_y)
+    locked = np.abs(sin_y) > 1.0 - 1e-9
+    x = np.where(locked,
+                 np.arctan2(matrices[:, 1, 0] * sin_y, matrices[:, 1, 1]),
+                 np.arctan2(matrices[:, 1, 2], matrices[:, 2, 2]))
+    z = np.where(locked, 0.0,
+                 np.arctan2(matrices[:, 0, 1], matrices[:, 0, 0]))
+    return np.degrees(np.column_stack([x, y, z]))
+
+
+def align_to_normals(transforms, normals, aim=(0.0, 1.0, 0.0),
+                     alignment=None):
+    """Returns transforms whose aim axis follows the given normals
+
+    The random rotation is applied in the instance's local space first
+    and the result is then tilted onto the normal, all in one pass.
+    alignment can be the already computed normal_alignment_matrices of
+    normals and aim, so only the random rotations are recomputed.
+    """
+    if alignment is None:
+        alignment = normal_alignment_matrices(normals, aim)
+    rotations = np.matmul(rotation_matrices(transforms.rotate), alignment)
+    return ScatterTransforms(transforms.translate,
+                             euler_from_matrices(rotations),
+                             transforms.scale)
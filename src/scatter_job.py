@@ -0,0 +1,110 @@
+"""Chunked, cancellable application of scatter transforms."""
+import contextlib
+import logging
+import time
+
+import instrument
+import maya_host
+
+log = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def undo_chunk(name, cmds=None):
+    """Groups every command run inside the block into one undo entry"""
+    cmds = cmds or maya_host.maya_cmds()
+    cmds.undoInfo(openChunk=True, chunkName=name)
+    try:
+        yield
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+
+@contextlib.contextmanager
+def undo_disabled(cmds=None):
+    """Keeps every command run inside the block out of the undo queue"""
+    cmds = cmds or maya_host.maya_cmds()
+    enabled = cmds.undoInfo(query=True, state=True)
+    cmds.undoInfo(stateWithoutFlush=False)
+    try:
+        yield
+    finally:
+        cmds.undoInfo(stateWithoutFlush=enabled)
+
+
+class ScatterJob(object):
+    """Writes transforms through a scatter output a chunk at a time
+
+    progress_callback is called with the job after every chunk, which
+    is where a ui updates its progress bar, processes events and may
+    call cancel. A cancelled job deletes everything it created.
+    Outputs that aren't chunkable are written in a single chunk.
+    """
+
+    def __init__(self, output, scatter_name, instance_group, transforms,
+                 chunk_size=1000, progress_callback=None, cmds=None):
+        self.output = output
+        self.scatter_name = scatter_name
+        self.instance_group = instance_group
+        self.transforms = transforms
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self.cmds = cmds or maya_host.maya_cmds()
+        self.created = []
+        self.done = 0
+        self.elapsed = 0.0
+        self.cancelled = False
+
+    @property
+    def total(self):
+        return len(self.transforms)
+
+    @property
+    def instances_per_second(self):
+        if not self.elapsed:
+            return 0.0
+        return self.done / self.elapsed
+
+    def cancel(self):
+        """Stops the job after the current chunk"""
+        self.cancelled = True
+
+    def chunks(self):
+        """Yields the start and stop index of every chunk"""
+        chunk_size = self.total
+        if getattr(self.output, "chunkable", False):
+            chunk_size = max(1, self.chunk_size)
+        for start in range(0, self.total, max(1, chunk_size)):
+            yield start, min(start + chunk_size, self.total)
+
+    def run(self):
+        """Runs every chunk inside one undo chunk, returns created nodes"""
+        start_time = time.perf_counter()
+        with undo_chunk("scatter " + self.scatter_name, self.cmds):
+            for start, stop in self.chunks():
+                if self.cancelled:
+                    break
+                with instrument.span("scatter_job.chunk", start=start,
+                                     stop=stop):
+                    self.created.extend(self.output.write(
+                        self.scatter_name, self.instance_group,
+                        self.transforms[start:stop]))
+                self.done = stop
+                self.elapsed = time.perf_counter() - start_time
+                if self.progress_callback:
+                    self.progress_callback(self)
+            if self.cancelled:
+                self.rollback()
+        self.elapsed = time.perf_counter() - start_time
+        instrument.count("scatter_job.instances", self.done)
+        log.info("Scattered %d of %d instances in %.2fs (%.0f/s)",
+                 self.done, self.total, self.elapsed,
+                 self.instances_per_second)
+        return self.created
+
+    def rollback(self):
+        """Deletes every node the job created so far"""
+        nodes = [node for node in self.created if self.cmds.objExists(node)]
+        if nodes:
+            self.cmds.delete(nodes)
+        self.created = []
@@ -0,0 +1,170 @@
+"""Output backends that turn computed scatter transforms into scene data.
+
+Every backend takes the scatter object name, the instance group the
+tool created and a ScatterTransforms, so the ui can swap between them.
+"""
+import collections
+import json
+import os
+
+import numpy as np
+
+import maya_host
+import point_cache
+
+
+class ScatterOutput(object):
+    """Base class for scatter output backends"""
+
+    name = None
+    # Whether write can be called several times for parts of a scatter
+    chunkable = False
+
+    def __init__(self, cmds=None):
+        self.cmds = cmds or maya_host.maya_cmds()
+
+    def write(self, scatter_name, instance_group, transforms):
+        """Creates the output and returns the names of what it made"""
+        raise NotImplementedError
+
+
+class TransformsOutput(ScatterOutput):
+    """One instanced transform node per point, the original behavior"""
+
+    name = "Transforms"
+    chunkable = True
+
+    def write(self, scatter_name, instance_group, transforms):
+        cmds = self.cmds
+        instances = []
+        for index in range(len(transforms)):
+            new_instance = cmds.instance(scatter_name,
+                                         name=scatter_name + '_instance#',
+                                         smartTransform=True)[0]
+            cmds.xform(new_instance,
+                       translation=transforms.translate[index].tolist(),
+                       rotation=transforms.rotate[index].tolist(),
+                       scale=transforms.scale[index].tolist())
+            instances.append(new_instance)
+        if instances:
+            instances = cmds.parent(instances, instance_group)
+        return instances
+
+
+class InstancerOutput(ScatterOutput):
+    """A single particle instancer holding per-point arrays
+
+    The particle shape stores position, rotationPP and scalePP arrays,
+    so a scatter of any size adds a fixed number of nodes to the scene.
+    """
+
+    name = "Particle Instancer"
+
+    def write(self, scatter_name, instance_group, transforms):
+        cmds = self.cmds
+        points = [tuple(point) for point in transforms.translate.tolist()]
+        particle, shape = cmds.particle(position=points,
+                                        name=scatter_name + '_points#')
+        self._set_vector_array(shape, "rotationPP", transforms.rotate)
+        self._set_vector_array(shape, "scalePP", transforms.scale)
+        cmds.saveInitialState(shape)
+        instancer = cmds.particleInstancer(
+            shape, addObject=True, object=scatter_name,
+            position="worldPosition", rotation="rotationPP",
+            scale="scalePP", name=scatter_name + '_instancer#')
+        cmds.parent([particle, instancer], instance_group)
+        return [particle, instancer]
+
+    def _set_vector_array(self, shape, attribute, values):
+        cmds = self.cmds
+        if not cmds.attributeQuery(attribute, node=shape, exists=True):
+            cmds.addAttr(shape, longName=attribute, dataType="vectorArray")
+            cmds.addAttr(shape, longName=attribute + "0",
+                         dataType="vectorArray")
+        cmds.setAttr(shape + "." + attribute, len(values),
+                     *[tuple(value) for value in values.tolist()],
+                     type="vectorArray")
+
+
+class PointCacheOutput(ScatterOutput):
+    """Writes the transforms to a point cache file instead of nodes
+
+    The file is named after the instance group and written to folder,
+    the workspace data folder by default, as a memory-mappable point
+    cache, .npz or .json depending on the extension. Its path is stored
+    on the group's pointCache attribute. Writing a group again replaces
+    its cache file, and removes the previous one if it moved.
+    """
+
+    attribute = "pointCache"
+
+    name = "Point Cache"
+    extension = point_cache.EXTENSION
+
+    def __init__(self, cmds=None, folder=None):
+        super(PointCacheOutput, self).__init__(cmds)
+        self.folder = folder
+
+    def cache_path(self, instance_group):
+        folder = self.folder
+        if folder is None:
+            root = self.cmds.workspace(query=True, rootDirectory=True)
+            folder = os.path.join(root, "data")
+        return os.path.join(folder, instance_group + self.extension)
+
+    def cached_path(self, instance_group):
+        """Returns the cache path stored on a group, or None"""
+        cmds = self.cmds
+        if not cmds.attributeQuery(self.attribute, node=instance_group,
+                                   exists=True):
+            return None
+        return cmds.getAttr(instance_group + "." + self.attribute)
+
+    def write(self, scatter_name, instance_group, transforms):
+        cmds = self.cmds
+        path = self.cache_path(instance_group)
+        old_path = self.cached_path(instance_group)
+        # Overwrites the cache of a group that is written again
+        write_point_cache(path, scatter_name, transforms)
+        if old_path and old_path != path and os.path.exists(old_path):
+            os.remove(old_path)
+        if old_path is None:
+            cmds.addAttr(instance_group, longName=self.attribute,
+                         dataType="string")
+        cmds.setAttr(instance_group + "." + self.attribute, path,
+                     type="string")
+        return [path]
+
+    def remove(self, instance_group):
+        """Deletes the cache file of a group and its pointCache attribute"""
+        path = self.cached_path(instance_group)
+        if path is None:
+            return
+        if path and os.path.exists(path):
+            os.remove(path)
+        self.cmds.deleteAttr(instance_group, attribute=self.attribute)
+
+
+def write_point_cache(path, scatter_name, transforms):
+    """Writes transforms to a point cache, .json or .npz file"""
+    if path.endswith(point_cache.EXTENSION):
+        point_cache.write(path, transforms, sources=[scatter_name])
+        return
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    if path.endswith(".json"):
+        with open(path, "w") as cache_file:
+            json.dump({"source": scatter_name,
+                       "translate": transforms.translate.tolist(),
+                       "rotate": transforms.rotate.tolist(),
+                       "scale": transforms.scale.tolist()}, cache_file)
+        return
+    np.savez(path, source=np.array(scatter_name),
+             translate=transforms.translate, rotate=transforms.rotate,
+             scale=transforms.scale)
+
+
+OUTPUTS = collections.OrderedDict(
+    (output.name, output) for output in
+    (TransformsOutput, InstancerOutput, PointCacheOutput))
@@ -0,0 +1,62 @@
+"""A lightweight live preview of a scatter before it is applied."""
+import logging
+import time
+
+import maya_host
+import placement
+import scatter_job
+import scatter_output
+
+log = logging.getLogger(__name__)
+
+PREVIEW_GROUP = "scatterPreview_grp"
+# The particleInstancer levelOfDetail that draws bounding boxes
+BOUNDING_BOXES = 2
+
+
+class ScatterPreview(object):
+    """Draws a scatter as one particle instancer of bounding boxes
+
+    The preview only ever adds a group, a particle shape and an
+    instancer to the scene, rebuilt on every update with undo turned
+    off so previews never fill the undo queue. Placements come from an
+    IncrementalPlacement, which can be shared with Apply so it reuses
+    the previewed points.
+    """
+
+    def __init__(self, placer=None, cmds=None):
+        self.placer = placer or placement.IncrementalPlacement()
+        self.cmds = cmds or maya_host.maya_cmds()
+        self.group = None
+        self.seconds = 0.0
+
+    def update(self, scatter_name, source, settings):
+        """Recomputes what changed and redraws, returns the Placement"""
+        start = time.perf_counter()
+        scatter = self.placer.update(source, settings)
+        with scatter_job.undo_disabled(self.cmds):
+            self._delete_group()
+            if len(scatter):
+                self._draw(scatter_name, scatter.transforms)
+        self.seconds = time.perf_counter() - start
+        log.debug("Previewed %d instances in %.1fms, recomputed %s",
+                  len(scatter), self.seconds * 1000.0,
+                  ", ".join(self.placer.recomputed) or "nothing")
+        return scatter
+
+    def clear(self):
+        """Removes the preview from the scene, keeping the cached points"""
+        with scatter_job.undo_disabled(self.cmds):
+            self._delete_group()
+
+    def _draw(self, scatter_name, transforms):
+        cmds = self.cmds
+        self.group = cmds.group(empty=True, name=PREVIEW_GROUP)
+        output = scatter_output.InstancerOutput(cmds)
+        _, instancer = output.write(scatter_name, self.group, transforms)
+        cmds.setAttr(instancer + ".levelOfDetail", BOUNDING_BOXES)
+
+    def _delete_group(self):
+        if self.group and self.cmds.objExists(self.group):
+            self.cmds.delete(self.group)
+        self.group = None
@@ -0,0 +1,302 @@
+"""Version history of the scenes in a folder, kept in a small manifest.
+
+Each scenes folder gets a .smartsave_manifest.json, so listing versions
+or finding the latest one never needs a directory scan. Saves don't
+rewrite it: each one appends a line to a journal next to it, and the
+journal is folded into the manifest once it has grown. Appends and
+rewrites hold a lock file, so artists saving into the same folder at
+the same time don't lose each other's entries.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import time
+
+import scene_name
+
+MANIFEST_NAME = ".smartsave_manifest.json"
+JOURNAL_NAME = ".smartsave_manifest.journal"
+LOCK_NAME = ".smartsave_manifest.lock"
+MANIFEST_FORMAT = 1
+# The journal is folded into the manifest once it is this many bytes
+COMPACT_SIZE = 64 * 1024
+LOCK_TIMEOUT = 10.0
+# A lock this many seconds old was left by a crashed save
+STALE_LOCK_AGE = 60.0
+
+
+class SceneVersion(object):
+    """One saved version of a scene and its file details"""
+
+    __slots__ = ("folder", "descriptor", "task", "ver", "ext", "size",
+                 "mtime", "digest")
+
+    def __init__(self, folder, descriptor, task, ver, ext, size, mtime,
+                 digest=None):
+        self.folder = folder
+        self.descriptor = descriptor
+        self.task = task
+        self.ver = ver
+        self.ext = ext
+        self.size = size
+        self.mtime = mtime
+        self.digest = digest
+
+    @property
+    def filename(self):
+        return "{}_{}_v{:03d}{}".format(self.descriptor, self.task, self.ver,
+                                        self.ext)
+
+    @property
+    def path(self):
+        return os.path.join(self.folder, self.filename)
+
+    def __repr__(self):
+        return "SceneVersion({!r})".format(self.path)
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Returns the sha1 hex digest of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as scene:
+        for chunk in iter(lambda: scene.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _latest_key(name):
+    """Returns the latest table key and version of a name, or None"""
+    fields = scene_name.parse(name)
+    if fields is None:
+        return None
+    descriptor, task, ver, ext = fields
+    return "|".join((descriptor, task, ext)), ver
+
+
+def _apply(entries, latest, name, entry):
+    """Applies one journal line, only touching the latest of its key"""
+    parsed = _latest_key(name)
+    if parsed is None:
+        # Not a scene, there is nothing it could change
+        return
+    key, ver = parsed
+    if entry is not None:
+        entries[name] = entry
+        latest[key] = max(latest.get(key, 0), ver)
+        return
+    if entries.pop(name, None) is None or latest.get(key) != ver:
+        return
+    # The latest version was forgotten, look for the next one
+    vers = [other_ver for other_key, other_ver
+            in filter(None, map(_latest_key, entries))
+            if other_key == key]
+    if vers:
+        latest[key] = max(vers)
+    else:
+        del latest[key]
+
+
+def _check_name(filename):
+    if scene_name.parse(filename) is None:
+        raise ValueError("'{}' is not a scene file name".format(filename))
+
+
+class SceneHistory(object):
+    """Reads and updates the version manifest of one scenes folder"""
+
+    def __init__(self, folder):
+        self.folder = os.path.abspath(str(folder))
+        self.manifest_path = os.path.join(self.folder, MANIFEST_NAME)
+        self.journal_path = os.path.join(self.folder, JOURNAL_NAME)
+        self.lock_path = os.path.join(self.folder, LOCK_NAME)
+        self._entries = None
+        self._latest = None
+
+    @property
+    def entries(self):
+        """Maps file names to their size, mtime and optional digest"""
+        if self._entries is None:
+            self._entries, self._latest = self._load()
+        return self._entries
+
+    @property
+    def latest_versions(self):
+        """Maps "descriptor|task|ext" keys to their latest version"""
+        if self._latest is None:
+            self._entries, self._latest = self._load()
+        return self._latest
+
+    def _read(self):
+        """Returns the entries and latest table, None without a manifest"""
+        # The journal is read first. If it is folded into the manifest in
+        # between, its lines are replayed onto a manifest that already
+        # has them, which leaves it unchanged.
+        journal = self._read_journal()
+        try:
+            with open(self.manifest_path) as manifest:
+                data = json.load(manifest)
+        except (IOError, OSError, ValueError):
+            return None
+        if data.get("format") != MANIFEST_FORMAT:
+            return None
+        entries, latest = data["files"], data["latest"]
+        for name, entry in journal:
+            _apply(entries, latest, name, entry)
+        return entries, latest
+
+    def _read_journal(self):
+        try:
+            with open(self.journal_path) as journal:
+                lines = journal.read().splitlines()
+        except (IOError, OSError):
+            return []
+        changes = []
+        for line in lines:
+            try:
+                change = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash
+                continue
+            changes.append((change["file"], change["entry"]))
+        return changes
+
+    def _load(self):
+        loaded = self._read()
+        if loaded is None:
+            return self._scan()
+        return loaded
+
+    def _scan(self):
+        """Builds entries from the folder, used when there's no manifest"""
+        if not os.path.isdir(self.folder):
+            return {}, {}
+        with self._locked():
+            return self._scan_locked()
+
+    def _scan_locked(self):
+        """Scans the folder into a new manifest, needs the lock"""
+        entries, latest = {}, {}
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and scene_name.parse(entry.name):
+                stat = entry.stat()
+                _apply(entries, latest, entry.name,
+                       {"size": stat.st_size, "mtime": stat.st_mtime})
+        # The scan already sees what the journal recorded
+        self._write(entries, latest)
+        return entries, latest
+
+    def _write(self, entries, latest):
+        """Replaces the manifest and empties the journal, needs the lock"""
+        partial = self.manifest_path + ".part"
+        with open(partial, "w") as manifest:
+            json.dump({"format": MANIFEST_FORMAT, "files": entries,
+                       "latest": latest}, manifest, indent=1, sort_keys=True)
+        os.replace(partial, self.manifest_path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    @contextlib.contextmanager
+    def _locked(self, timeout=LOCK_TIMEOUT):
+        """Holds the folder's lock file, breaking it once it is stale"""
+        deadline = time.time() + timeout
+        while True:
+            try:
+                handle = os.open(self.lock_path,
+                                 os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    age = time.time() - os.stat(self.lock_path).st_mtime
+                    if age > STALE_LOCK_AGE:
+                        os.remove(self.lock_path)
+                        continue
+                except OSError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError("Timed out waiting for " +
+                                       self.lock_path)
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            os.close(handle)
+            os.remove(self.lock_path)
+
+    def _journal(self, filename, entry):
+        """Appends one change, folding the journal in once it has grown"""
+        line = json.dumps({"file": filename, "entry": entry},
+                          sort_keys=True) + "\n"
+        with self._locked():
+            if not os.path.exists(self.manifest_path):
+                # A folder's first save builds the manifest, which the
+                # journal is then folded into
+                self._scan_locked()
+            with open(self.journal_path, "a") as journal:
+                journal.write(line)
+                size = journal.tell()
+            if size >= COMPACT_SIZE:
+                loaded = self._read()
+                if loaded is None:
+                    # The manifest can't be read, build it again
+                    self._scan_locked()
+                else:
+                    self._write(*loaded)
+        if self._entries is not None:
+            _apply(self._entries, self._latest, filename, entry)
+
+    def record(self, filename, hash_contents=False):
+        """Adds or updates one saved file in the manifest"""
+        _check_name(filename)
+        stat = os.stat(os.path.join(self.folder, filename))
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime}
+        if hash_contents:
+            entry["digest"] = file_digest(os.path.join(self.folder, filename))
+        self._journal(filename, entry)
+        return entry
+
+    def forget(self, filename):
+        """Removes a file that was deleted or moved from the manifest"""
+        _check_name(filename)
+        self._journal(filename, None)
+
+    def refresh(self):
+        """Rebuilds the manifest from the folder contents"""
+        self._entries, self._latest = self._scan()
+
+    def versions(self, descriptor, task, ext=None):
+        """Returns every version of a descriptor/task, oldest first"""
+        found = []
+        for name, entry in self.entries.items():
+            fields = scene_name.parse(name)
+            if fields[:2] != (descriptor, task):
+                continue
+            if ext is not None and fields[3] != ext:
+                continue
+            found.append(SceneVersion(self.folder, *fields,
+                                      size=entry["size"],
+                                      mtime=entry["mtime"],
+                                      digest=entry.get("digest")))
+        found.sort(key=lambda version: version.ver)
+        return found
+
+    def latest(self, descriptor, task, ext=None):
+        """Returns the newest SceneVersion of a descriptor/task or None"""
+        versions = self.versions(descriptor, task, ext)
+        return versions[-1] if versions else None
+
+
+def latest_per_asset(folders):
+    """Returns {(folder, descriptor, task, ext): ver} for many folders
+
+    Only the latest table of each manifest and the journal lines not
+    yet folded into it are read. A folder without a readable manifest
+    is scanned once, which writes its manifest for the next call.
+    """
+    latest = {}
+    for folder in folders:
+        folder = os.path.abspath(str(folder))
+        for key, ver in SceneHistory(folder).latest_versions.items():
+            descriptor, task, ext = key.split("|")
+            latest[(folder, descriptor, task, ext)] = ver
+    return latest
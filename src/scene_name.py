@@ -0,0 +1,51 @@
+"""Parsing of descriptor_task_v###.ext scene file names."""
+import re
+
+# Scenes kept in a dedup_store are saved as a manifest with this suffix
+STORED_SUFFIX = ".chunks"
+SCENE_NAME_RE = re.compile(
+    r"^(?P<descriptor>[^_]+)_(?P<task>[^_]+)_v(?P<ver>\d+)(?P<ext>\.[^.]*)"
+    r"(?:" + re.escape(STORED_SUFFIX) + r")?$")
+
+
+def parse(name):
+    """Returns (descriptor, task, ver, ext) of a file name, or None
+
+    ver is an int, so versions past v999 compare numerically. A stored
+    scene's manifest parses the same as the scene it stands in for.
+    """
+    match = SCENE_NAME_RE.match(name)
+    if not match:
+        return None
+    descriptor, task, ver, ext = match.groups()
+    return descriptor, task, int(ver), ext
+
+
+def parse_or_raise(name):
+    """Returns the parsed fields of a file name, raises ValueError"""
+    fields = parse(name)
+    if fields is None:
+        raise ValueError("'{}' is not a descriptor_task_v###.ext "
+                         "scene file name".format(name))
+    return fields
+
+
+def scan_versions(names):
+    """Returns the max version of every (descriptor, task, ext)
+
+    Runs in a single pass with no sorting. Names that don't follow the
+    scene naming convention are skipped, and their count is returned
+    alongside the versions.
+    """
+    versions = {}
+    skipped = 0
+    for name in names:
+        fields = parse(name)
+        if fields is None:
+            skipped += 1
+            continue
+        descriptor, task, ver, ext = fields
+        key = (descriptor, task, ext)
+        if ver > versions.get(key, 0):
+            versions[key] = ver
+    return versions, skipped
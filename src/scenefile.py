@@ -1,39 +1,110 @@
+import os
 from pathlib import Path
 
+import scene_name
+
+
+def _field(slot):
+    """A property that clears the cached filename and path when set"""
+
+    def getter(self):
+        return getattr(self, slot)
+
+    def setter(self, val):
+        setattr(self, slot, val)
+        self._filename = None
+        self._path = None
+
+    return property(getter, setter)
+
 
 class SceneFile(object):
-    """An abstract representation of a Scene file."""
+    """An abstract representation of a Scene file.
 
-    def __init__(self, path):
-        self.folder_path = Path()
+    Uses __slots__ so large numbers of them stay small, and caches the
+    formatted filename and path until one of the fields changes.
+    """
+
+    __slots__ = ("_folder_path", "_descriptor", "_task", "_ver", "_ext",
+                 "_filename", "_path")
 
+    descriptor = _field("_descriptor")
+    task = _field("_task")
+    ver = _field("_ver")
+    ext = _field("_ext")
+
+    def __init__(self, path):
         # Default values in case they're missing from the path
-        self.descriptor = 'main'
-        self.task = None
-        self.ver = 1
-        self.ext = '.ma'
+        self._set_fields(Path(), 'main', None, 1, '.ma')
         self._init_from_path(path)  # A private method starts with '_'
 
+    def _set_fields(self, folder_path, descriptor, task, ver, ext):
+        self._folder_path = folder_path
+        self._descriptor = descriptor
+        self._task = task
+        self._ver = ver
+        self._ext = ext
+        self._filename = None
+        self._path = None
+
+    @classmethod
+    def from_many(cls, paths):
+        """Builds a SceneFile for every path in one pass
+
+        Folder Path objects are shared between files in the same folder
+        and names that aren't scene files are skipped.
+        """
+        folders = {}
+        scene_files = []
+        for path in paths:
+            folder, name = os.path.split(str(path))
+            fields = scene_name.parse(name)
+            if fields is None:
+                continue
+            folder_path = folders.get(folder)
+            if folder_path is None:
+                folder_path = folders[folder] = Path(folder)
+            scene_file = cls.__new__(cls)
+            scene_file._set_fields(folder_path, *fields)
+            scene_files.append(scene_file)
+        return scene_files
+
+    def copy(self, **fields):
+        """Returns a copy with the given fields changed"""
+        scene_file = self.__class__.__new__(self.__class__)
+        scene_file._set_fields(self._folder_path, self._descriptor,
+                               self._task, self._ver, self._ext)
+        for name, val in fields.items():
+            setattr(scene_file, name, val)
+        return scene_file
+
+    @property
+    def folder_path(self):
+        return self._folder_path
+
+    @folder_path.setter
+    def folder_path(self, val):
+        self._folder_path = Path(val)
+        self._path = None
+
     @property
     def filename(self):
-        pattern = "{descriptor}_{task}_v{ver:03d}{ext}"
-        return pattern.format(descriptor=self.descriptor,
-                              task=self.task,
-                              ver=self.ver,
-                              ext=self.ext)
+        if self._filename is None:
+            pattern = "{descriptor}_{task}_v{ver:03d}{ext}"
+            self._filename = pattern.format(descriptor=self._descriptor,
+                                            task=self._task,
+                                            ver=self._ver,
+                                            ext=self._ext)
+        return self._filename
 
     @property
     def path(self):
-        return self.folder_path / self.filename
+        if self._path is None:
+            self._path = self._folder_path / self.filename
+        return self._path
 
     def _init_from_path(self, path):
         path = Path(path)
         self.folder_path = path.parent
-        self.ext = path.suffix
-        self.descriptor, self.task, ver = path.stem.split("_")
-        self.ver = int(ver.split("v")[-1])
-
-
-scene_file = SceneFile("D:/tank_model_v001.ma")
-print(scene_file.path)  # prints D:\tank_model_v001.ma
-print(scene_file.filename)  # prints tank_model_v001.ma
+        self.descriptor, self.task, self.ver, self.ext = \
+            scene_name.parse_or_raise(path.name)
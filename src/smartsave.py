@@ -1,211 +1,142 @@
+"""Versioned scene saving. Maya is only imported when a scene is saved."""
 import logging
-
-from PySide2 import QtWidgets, QtCore
-from shiboken2 import wrapInstance
-import maya.OpenMayaUI as omui
-import maya.cmds as cmds
-import pymel.core as pmc
-from pymel.core.system import Path
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import dedup_store
+import instrument
+import maya_host
+import scene_history
+import scenefile
+import version_index
 
 log = logging.getLogger(__name__)
 
 
-def maya_main_window():
-    """Return the maya main window widget"""
-    main_window = omui.MQtUtil.mainWindow()
-    return wrapInstance(long(main_window), QtWidgets.QWidget)
-
-
-class SmartSaveUI(QtWidgets.QDialog):
-    """Smart Class UI Class"""
-
-    def __init__(self):
-        super(SmartSaveUI, self).__init__(parent=maya_main_window())
-        self.setWindowTitle("Smart Save")
-        self.setMinimumWidth(500)
-        self.setMinimumHeight(200)
-        self.setWindowFlags(self.windowFlags() ^
-                            QtCore.Qt.WindowContextHelpButtonHint)
-        self.scenefile = SceneFile()
-        self.create_ui()
-        self.create_connections()
-
-    def create_ui(self):
-        self.title_lbl = QtWidgets.QLabel("Smart Save")
-        self.title_lbl.setStyleSheet("font: bold 20px")
-        self.folder_lay = self._create_folder_ui()
-        self.filename_lay = self._create_filename_ui()
-        self.button_lay = self._create_button_ui()
-        self.main_lay = QtWidgets.QVBoxLayout()
-        self.main_lay.addWidget(self.title_lbl)
-        self.main_lay.addLayout(self.folder_lay)
-        self.main_lay.addLayout(self.filename_lay)
-        self.main_lay.addStretch()
-        self.main_lay.addLayout(self.button_lay)
-        self.setLayout(self.main_lay)
-
-    def create_connections(self):
-        """Connect Signals and Slots"""
-        self.folder_browse_btn.clicked.connect(self._browse_folder)
-        self.save_btn.clicked.connect(self._save)
-        self.save_inc_btn.clicked.connect(self._save_increment)
-
-    @QtCore.Slot()
-    def _save_increment(self):
-        """Save an increment of the scene"""
-        self._set_scenefile_properties_from_ui()
-        self.scenefile.save_increment()
-        self.ver_sbx.setValue(self.scenefile.ver)
-
-    @QtCore.Slot()
-    def _save(self):
-        """Save the scene"""
-        self._set_scenefile_properties_from_ui()
-        self.scenefile.save()
-
-    def _set_scenefile_properties_from_ui(self):
-        self.scenefile.folder_path = self.folder_le.text()
-        self.scenefile.descriptor = self.descriptor_le.text()
-        self.scenefile.task = self.task_le.text()
-        self.scenefile.ver = self.ver_sbx.value()
-        self.scenefile.ext = self.ext_lbl.text()
-
-    @QtCore.Slot()
-    def _browse_folder(self):
-        """Opens a dialogue box to browse the folder"""
-        folder = QtWidgets.QFileDialog.getExistingDirectory(
-            parent=self, caption="Select folder", dir=self.folder_le.text(),
-            options=QtWidgets.QFileDialog.ShowDirsOnly |
-                    QtWidgets.QFileDialog.DontResolveSymlinks)
-        self.folder_le.setText(folder)
-
-    def _create_button_ui(self):
-        self.save_btn = QtWidgets.QPushButton("Save")
-        self.save_inc_btn = QtWidgets.QPushButton("Save Increment")
-        layout = QtWidgets.QHBoxLayout()
-        layout.addWidget(self.save_btn)
-        layout.addWidget(self.save_inc_btn)
-        return layout
-
-    def _create_filename_ui(self):
-        layout = self._create_filename_headers()
-        self.descriptor_le = QtWidgets.QLineEdit(self.scenefile.descriptor)
-        self.descriptor_le.setMinimumWidth(100)
-        self.task_le = QtWidgets.QLineEdit(self.scenefile.task)
-        self.task_le.setFixedWidth(50)
-        self.ver_sbx = QtWidgets.QSpinBox()
-        self.ver_sbx.setButtonSymbols(QtWidgets.QAbstractSpinBox.PlusMinus)
-        self.ver_sbx.setFixedWidth(50)
-        self.ver_sbx.setValue(self.scenefile.ver)
-        self.ext_lbl = QtWidgets.QLabel(".ma")
-        layout.addWidget(self.descriptor_le, 1, 0)
-        layout.addWidget(QtWidgets.QLabel("_"), 1, 1)
-        layout.addWidget(self.task_le, 1, 2)
-        layout.addWidget(QtWidgets.QLabel("_v"), 1, 3)
-        layout.addWidget(self.ver_sbx, 1, 4)
-        layout.addWidget(self.ext_lbl, 1, 5)
-        return layout
-
-    def _create_filename_headers(self):
-        self.descriptor_header_lbl = QtWidgets.QLabel("Description")
-        self.descriptor_header_lbl.setStyleSheet("font: bold")
-        self.task_header_lbl = QtWidgets.QLabel("Task")
-        self.task_header_lbl.setStyleSheet("font: bold")
-        self.ver_header_lbl = QtWidgets.QLabel("Version")
-        self.ver_header_lbl.setStyleSheet("font: bold")
-        layout = QtWidgets.QGridLayout()
-        layout.addWidget(self.descriptor_header_lbl, 0, 0)
-        layout.addWidget(self.task_header_lbl, 0, 2)
-        layout.addWidget(self.ver_header_lbl, 0, 4)
-        return layout
-
-    def _create_folder_ui(self):
-        default_folder = Path(cmds.workspace(rootDirectory=True, query=True))
-        default_folder = default_folder / "scenes"
-        self.folder_le = QtWidgets.QLineEdit(default_folder)
-        self.folder_browse_btn = QtWidgets.QPushButton("...")
-        layout = QtWidgets.QHBoxLayout()
-        layout.addWidget(self.folder_le)
-        layout.addWidget(self.folder_browse_btn)
-        return layout
-
-
-class SceneFile(object):
-    """An abstract representation of a Scene file."""
-    def __init__(self, path=None):
-        self._folder_path = Path(cmds.workspace(query=True,
+class SceneFile(scenefile.SceneFile):
+    """A Scene file that can be saved from Maya.
+
+    When store is a dedup_store.ChunkStore, saves are chunked into the
+    store and only a small manifest is written to the scenes folder.
+    path then rebuilds the scene file from its manifest when it's
+    missing on disk.
+    """
+
+    __slots__ = ("_store",)
+
+    def __init__(self, path=None, store=None):
+        self._store = store
+        self._set_fields(Path("scenes"), 'main', 'model', 1, '.ma')
+        if path:
+            self._init_from_path(path)
+            return
+        cmds = maya_host.maya_cmds()
+        self.folder_path = Path(cmds.workspace(query=True,
                                                rootDirectory=True)) / "scenes"
-        self.descriptor = 'main'
-        self.task = 'model'
-        self.ver = 1
-        self.ext = '.ma'
-        scene = pmc.system.sceneName()
-        if not path and scene:
-            path = scene
-        if not path and not scene:
+        scene = cmds.file(query=True, sceneName=True)
+        if scene:
+            self._init_from_path(scene)
+        else:
             log.info("Initialize with default properties")
-            return
-        self._init_from_path(path)
 
     @property
-    def folder_path(self):
-        return self._folder_path
-
-    @folder_path.setter
-    def folder_path(self, val):
-        self._folder_path = Path(val)
+    def store(self):
+        # from_many skips __init__, so the slot may be unset
+        return getattr(self, "_store", None)
 
-    @property
-    def filename(self):
-        pattern = "{descriptor}_{task}_v{ver:03d}{ext}"
-        return pattern.format(descriptor=self.descriptor,
-                              task=self.task,
-                              ver=self.ver,
-                              ext=self.ext)
+    @store.setter
+    def store(self, val):
+        self._store = val
 
     @property
     def path(self):
-        return self.folder_path / self.filename
+        path = self._scene_path()
+        if self.store is not None and not path.exists():
+            manifest = dedup_store.manifest_path(path)
+            if os.path.exists(manifest):
+                self.store.restore_file(manifest, path)
+        return path
 
-    def _init_from_path(self, path):
-        path = Path(path)
-        self.folder_path = path.parent
-        self.ext = path.ext
-        self.descriptor, self.task, ver = path.name.stripext().split("_")
-        self.ver = int(ver.split("v")[-1])
+    def _scene_path(self):
+        return scenefile.SceneFile.path.fget(self)
 
+    @instrument.timed("smartsave.save")
     def save(self):
+        index_current = self.index_is_current()
+        if self.store is not None:
+            return self._save_to_store(index_current)
         try:
-            return pmc.system.saveAs(self.path)
-        except RuntimeError as err:
+            result = self._save_as(self._scene_path())
+        except RuntimeError:
             log.warning("Missing directories in path. Creating folders...")
-            self.folder_path.makedirs_p()
-            return pmc.system.saveAs(self.path)
-
+            with instrument.span("smartsave.create_folders"):
+                self.folder_path.mkdir(parents=True, exist_ok=True)
+            result = self._save_as(self._scene_path())
+        self.record_saved(index_current)
+        return result
+
+    def _save_to_store(self, index_current=False):
+        local_path = self.save_to_temp()
+        self.folder_path.mkdir(parents=True, exist_ok=True)
+        manifest = dedup_store.manifest_path(self._scene_path())
+        with instrument.span("smartsave.store_file"):
+            self.store.store_file(local_path, manifest)
+        os.remove(str(local_path))
+        self.record_saved(index_current)
+        return manifest
+
+    def _save_as(self, path):
+        with instrument.span("smartsave.save_as", path=str(path)):
+            import pymel.core as pmc
+            return pmc.system.saveAs(str(path))
+
+    def save_to_temp(self):
+        """Saves the scene to a local temp file and returns its path
+
+        The open scene is renamed to the final path afterwards, so the
+        caller only has to move the temp file there.
+        """
+        local_folder = Path(tempfile.gettempdir()) / "smartsave"
+        local_folder.mkdir(parents=True, exist_ok=True)
+        local_path = local_folder / self.filename
+        self._save_as(local_path)
+        maya_host.maya_cmds().file(rename=str(self._scene_path()))
+        return local_path
+
+    def index_is_current(self):
+        """Returns whether the version index is up to date with the folder
+
+        Taken before a save and passed to record_saved, so the save
+        doesn't make the index rescan the folder.
+        """
+        return version_index.INDEX.is_current(self.folder_path)
+
+    @instrument.timed("smartsave.record_saved")
+    def record_saved(self, index_current=False):
+        """Adds the current version to the history and version index"""
+        filename = self.filename
+        if self.store is not None:
+            filename = filename + dedup_store.MANIFEST_SUFFIX
+        # The manifest write changes the folder mtime too, so it goes
+        # before the index stores the mtime
+        scene_history.SceneHistory(self.folder_path).record(filename)
+        version_index.INDEX.record(self.folder_path, self.descriptor,
+                                   self.task, self.ext, self.ver,
+                                   was_current=index_current)
+
+    @instrument.timed("smartsave.next_avail_ver")
     def next_avail_ver(self):
-        pattern = "{descriptor}_{task}_v*{ext}".format(
-            descriptor=self.descriptor, task=self.task, ext=self.ext)
-        matching_scenefiles = []
-        for file_ in self.folder_path.files():
-            if file_.name.fnmatch(pattern):
-                matching_scenefiles.append(file_)
-        if not matching_scenefiles:
-            return 1
-        matching_scenefiles.sort(reverse=True)
-        latest_scenefile = matching_scenefiles[0]
-        latest_scenefile = latest_scenefile.name.stripext()
-        latest_ver_num = int(latest_scenefile.split("_v")[-1])
-        return latest_ver_num + 1
+        return version_index.INDEX.next_version(
+            self.folder_path, self.descriptor, self.task, self.ext)
 
+    @instrument.timed("smartsave.save_increment")
     def save_increment(self):
         self.ver = self.next_avail_ver()
         self.save()
 
 
-scene_file = SceneFile("D:\\SCHOOL STUFF\\2021 spring\\Scripting for Animation\\WatersSean_Assignment2\\src\\tank_model_v002.ma")
-print(scene_file.folder_path)
-print(scene_file.descriptor)
-print(scene_file.task)
-print(scene_file.ver)
-print(scene_file.ext)
-print(scene_file.filename)
+if __name__ == "__main__":
+    import smartsave_batch
+    sys.exit(smartsave_batch.main())
@@ -0,0 +1,164 @@
+"""Headless batch versioning of scene files, no Maya required.
+
+Usage::
+
+    python -m smartsave batch <folder or scene> [...] [--workers N]
+    python -m smartsave archive <folder> [...] [--keep N] [--workers N]
+
+batch copies the latest version of every descriptor/task/ext found to
+the next available version in the same folder. archive gzips all but
+the newest versions.
+"""
+import argparse
+import concurrent.futures
+import logging
+import os
+import sys
+
+import archive
+import dedup_store
+import instrument
+import scene_history
+import scene_name
+import transfer
+import version_index
+from scenefile import SceneFile
+
+log = logging.getLogger(__name__)
+
+
+def find_scenes(paths, recursive=False):
+    """Yields every scene file path in paths, walking folders"""
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        if recursive:
+            for folder, _, names in os.walk(path):
+                for name in names:
+                    yield os.path.join(folder, name)
+        else:
+            for entry in os.scandir(path):
+                if entry.is_file():
+                    yield entry.path
+
+
+def plan_increments(scene_paths):
+    """Returns (source, target) pairs, one per descriptor/task/ext
+
+    The latest version given of each scene is copied to the version
+    after the highest one in its folder, so parallel copies never
+    collide. A scene kept in a chunk store is only there as its
+    manifest, so the manifest is copied to the new version's manifest,
+    which shares the same chunks.
+    """
+    latest = {}
+    skipped = 0
+    for path in scene_paths:
+        fields = scene_name.parse(os.path.basename(path))
+        if fields is None:
+            skipped += 1
+            continue
+        descriptor, task, ver, ext = fields
+        key = (os.path.dirname(os.path.abspath(path)), descriptor, task, ext)
+        latest_ver, latest_path = latest.get(key, (0, None))
+        # A scene restored next to its manifest is copied as the scene
+        if ver > latest_ver or (ver == latest_ver and _is_stored(latest_path)
+                                and not _is_stored(path)):
+            latest[key] = (ver, path)
+    if skipped:
+        log.info("Skipped %d files that aren't scene files", skipped)
+    index = version_index.VersionIndex()
+    plan = []
+    for ver, path in latest.values():
+        scene = SceneFile(path)
+        scene.ver = index.next_version(scene.folder_path, scene.descriptor,
+                                       scene.task, scene.ext)
+        target = str(scene.path)
+        if _is_stored(path):
+            target = dedup_store.manifest_path(target)
+        plan.append((path, target))
+    return plan
+
+
+def _is_stored(path):
+    return path is not None and path.endswith(scene_name.STORED_SUFFIX)
+
+
+def _copy(job):
+    source, target = job
+    return transfer.atomic_copy(source, target)
+
+
+def run_increments(plan, workers=None):
+    """Copies every planned increment across a process pool"""
+    histories = {}
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        for target in executor.map(_copy, plan, chunksize=16):
+            log.info("Saved %s", target)
+            folder, name = os.path.split(target)
+            if folder not in histories:
+                histories[folder] = scene_history.SceneHistory(folder)
+            histories[folder].record(name)
+    return [target for _, target in plan]
+
+
+def _at_least_one(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="smartsave")
+    commands = parser.add_subparsers(dest="command")
+    batch = commands.add_parser(
+        "batch", help="save an increment of every scene found")
+    batch.add_argument("paths", nargs="+",
+                       help="scene files or folders of scene files")
+    batch.add_argument("--recursive", action="store_true",
+                       help="look for scenes in sub folders too")
+    batch.add_argument("--workers", type=int, default=None,
+                       help="number of copy processes")
+    batch.add_argument("--dry-run", action="store_true",
+                       help="print the increments without copying")
+    archive_parser = commands.add_parser(
+        "archive", help="compress all but the newest versions")
+    archive_parser.add_argument("folders", nargs="+",
+                                help="scenes folders to archive")
+    archive_parser.add_argument("--keep", type=_at_least_one, default=3,
+                                help="newest versions to leave alone")
+    archive_parser.add_argument("--workers", type=int, default=None,
+                                help="number of archive processes")
+    for command_parser in (batch, archive_parser):
+        command_parser.add_argument(
+            "--trace", help="write timings to a .jsonl or .json trace file")
+    args = parser.parse_args(argv)
+    if args.command not in ("batch", "archive"):
+        parser.print_help()
+        return 1
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.trace:
+        instrument.enable()
+    try:
+        if args.command == "archive":
+            with instrument.span("smartsave_batch.archive"):
+                archive.archive_folders(args.folders, args.keep,
+                                        args.workers)
+            return 0
+        with instrument.span("smartsave_batch.plan"):
+            plan = plan_increments(find_scenes(args.paths, args.recursive))
+        for source, target in plan:
+            print("{} -> {}".format(source, target))
+        if not args.dry_run:
+            with instrument.span("smartsave_batch.copy", scenes=len(plan)):
+                run_increments(plan, args.workers)
+        return 0
+    finally:
+        if args.trace:
+            instrument.disable().export(args.trace)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
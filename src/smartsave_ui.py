@@ -0,0 +1,196 @@
+"""The Smart Save dialog, the only part of Smart Save that needs Qt."""
+import logging
+import os
+import time
+
+from PySide2 import QtWidgets, QtCore
+from shiboken2 import wrapInstance
+import maya.OpenMayaUI as omui
+import maya.cmds as cmds
+
+import transfer
+from smartsave import SceneFile
+
+log = logging.getLogger(__name__)
+
+
+def maya_main_window():
+    """Return the maya main window widget"""
+    main_window = omui.MQtUtil.mainWindow()
+    return wrapInstance(int(main_window), QtWidgets.QWidget)
+
+
+class TransferThread(QtCore.QThread):
+    """Moves a locally saved scene to its final path off the UI thread"""
+
+    progress = QtCore.Signal(int, int)
+    failed = QtCore.Signal(str)
+
+    def __init__(self, source, target, parent=None):
+        super(TransferThread, self).__init__(parent)
+        self.source = source
+        self.target = target
+
+    def run(self):
+        try:
+            transfer.atomic_move(self.source, self.target,
+                                 self.progress.emit)
+        except (IOError, OSError) as err:
+            self.failed.emit(str(err))
+
+
+class SmartSaveUI(QtWidgets.QDialog):
+    """Smart Class UI Class"""
+
+    def __init__(self):
+        super(SmartSaveUI, self).__init__(parent=maya_main_window())
+        self.setWindowTitle("Smart Save")
+        self.setMinimumWidth(500)
+        self.setMinimumHeight(200)
+        self.setWindowFlags(self.windowFlags() ^
+                            QtCore.Qt.WindowContextHelpButtonHint)
+        self.scenefile = SceneFile()
+        self.create_ui()
+        self.create_connections()
+
+    def create_ui(self):
+        self.title_lbl = QtWidgets.QLabel("Smart Save")
+        self.title_lbl.setStyleSheet("font: bold 20px")
+        self.folder_lay = self._create_folder_ui()
+        self.filename_lay = self._create_filename_ui()
+        self.button_lay = self._create_button_ui()
+        self.main_lay = QtWidgets.QVBoxLayout()
+        self.main_lay.addWidget(self.title_lbl)
+        self.main_lay.addLayout(self.folder_lay)
+        self.main_lay.addLayout(self.filename_lay)
+        self.main_lay.addStretch()
+        self.main_lay.addLayout(self.button_lay)
+        self.status_lbl = QtWidgets.QLabel()
+        self.main_lay.addWidget(self.status_lbl)
+        self.setLayout(self.main_lay)
+
+    def create_connections(self):
+        """Connect Signals and Slots"""
+        self.folder_browse_btn.clicked.connect(self._browse_folder)
+        self.save_btn.clicked.connect(self._save)
+        self.save_inc_btn.clicked.connect(self._save_increment)
+
+    @QtCore.Slot()
+    def _save_increment(self):
+        """Save an increment of the scene"""
+        self._set_scenefile_properties_from_ui()
+        self.scenefile.ver = self.scenefile.next_avail_ver()
+        self.ver_sbx.setValue(self.scenefile.ver)
+        self._save_in_background()
+
+    @QtCore.Slot()
+    def _save(self):
+        """Save the scene"""
+        self._set_scenefile_properties_from_ui()
+        self._save_in_background()
+
+    def _save_in_background(self):
+        """Saves to a local temp file and moves it on a worker thread"""
+        self.index_current = self.scenefile.index_is_current()
+        local_path = self.scenefile.save_to_temp()
+        self.save_btn.setEnabled(False)
+        self.save_inc_btn.setEnabled(False)
+        self.transfer_start = time.time()
+        self.transfer_failed = False
+        self.transfer_thread = TransferThread(local_path,
+                                              self.scenefile.path, self)
+        self.transfer_thread.progress.connect(self._update_transfer)
+        self.transfer_thread.failed.connect(self._transfer_failed)
+        self.transfer_thread.finished.connect(self._transfer_finished)
+        self.transfer_thread.start()
+
+    @QtCore.Slot(int, int)
+    def _update_transfer(self, copied, total):
+        """Shows transfer throughput and elapsed time"""
+        elapsed = time.time() - self.transfer_start
+        rate = copied / elapsed / (1024 * 1024) if elapsed else 0.0
+        self.status_lbl.setText(
+            "Saving {:.0f}%  {:.1f} MB/s  {:.1f}s".format(
+                100.0 * copied / total if total else 100.0, rate, elapsed))
+
+    @QtCore.Slot(str)
+    def _transfer_failed(self, message):
+        log.warning("Background save failed: %s", message)
+        self.transfer_failed = True
+        self.status_lbl.setText("Save failed: " + message)
+
+    @QtCore.Slot()
+    def _transfer_finished(self):
+        self.save_btn.setEnabled(True)
+        self.save_inc_btn.setEnabled(True)
+        # A failed save over an existing version still finds that file
+        if not self.transfer_failed and self.scenefile.path.exists():
+            self.scenefile.record_saved(self.index_current)
+            self.status_lbl.setText("Saved {} in {:.1f}s".format(
+                self.scenefile.filename, time.time() - self.transfer_start))
+
+    def _set_scenefile_properties_from_ui(self):
+        self.scenefile.folder_path = self.folder_le.text()
+        self.scenefile.descriptor = self.descriptor_le.text()
+        self.scenefile.task = self.task_le.text()
+        self.scenefile.ver = self.ver_sbx.value()
+        self.scenefile.ext = self.ext_lbl.text()
+
+    @QtCore.Slot()
+    def _browse_folder(self):
+        """Opens a dialogue box to browse the folder"""
+        folder = QtWidgets.QFileDialog.getExistingDirectory(
+            parent=self, caption="Select folder", dir=self.folder_le.text(),
+            options=QtWidgets.QFileDialog.ShowDirsOnly |
+                    QtWidgets.QFileDialog.DontResolveSymlinks)
+        self.folder_le.setText(folder)
+
+    def _create_button_ui(self):
+        self.save_btn = QtWidgets.QPushButton("Save")
+        self.save_inc_btn = QtWidgets.QPushButton("Save Increment")
+        layout = QtWidgets.QHBoxLayout()
+        layout.addWidget(self.save_btn)
+        layout.addWidget(self.save_inc_btn)
+        return layout
+
+    def _create_filename_ui(self):
+        layout = self._create_filename_headers()
+        self.descriptor_le = QtWidgets.QLineEdit(self.scenefile.descriptor)
+        self.descriptor_le.setMinimumWidth(100)
+        self.task_le = QtWidgets.QLineEdit(self.scenefile.task)
+        self.task_le.setFixedWidth(50)
+        self.ver_sbx = QtWidgets.QSpinBox()
+        self.ver_sbx.setButtonSymbols(QtWidgets.QAbstractSpinBox.PlusMinus)
+        self.ver_sbx.setFixedWidth(50)
+        self.ver_sbx.setValue(self.scenefile.ver)
+        self.ext_lbl = QtWidgets.QLabel(".ma")
+        layout.addWidget(self.descriptor_le, 1, 0)
+        layout.addWidget(QtWidgets.QLabel("_"), 1, 1)
+        layout.addWidget(self.task_le, 1, 2)
+        layout.addWidget(QtWidgets.QLabel("_v"), 1, 3)
+        layout.addWidget(self.ver_sbx, 1, 4)
+        layout.addWidget(self.ext_lbl, 1, 5)
+        return layout
+
+    def _create_filename_headers(self):
+        self.descriptor_header_lbl = QtWidgets.QLabel("Description")
+        self.descriptor_header_lbl.setStyleSheet("font: bold")
+        self.task_header_lbl = QtWidgets.QLabel("Task")
+        self.task_header_lbl.setStyleSheet("font: bold")
+        self.ver_header_lbl = QtWidgets.QLabel("Version")
+        self.ver_header_lbl.setStyleSheet("font: bold")
+        layout = QtWidgets.QGridLayout()
+        layout.addWidget(self.descriptor_header_lbl, 0, 0)
+        layout.addWidget(self.task_header_lbl, 0, 2)
+        layout.addWidget(self.ver_header_lbl, 0, 4)
+        return layout
+
+    def _create_folder_ui(self):
+        default_folder = os.path.join(
+            cmds.workspace(rootDirectory=True, query=True), "scenes")
+        self.folder_le = QtWidgets.QLineEdit(default_folder)
+        self.folder_browse_btn = QtWidgets.QPushButton("...")
+        layout = QtWidgets.QHBoxLayout()
+        layout.addWidget(self.folder_le)
+        layout.addWidget(self.folder_browse_btn)
+        return layout
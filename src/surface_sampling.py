@@ -0,0 +1,100 @@
+"""Uniform scattering over the triangle surface of a mesh."""
+import collections
+
+import numpy as np
+
+import random_streams
+
+CACHE_SIZE = 8
+_table_cache = collections.OrderedDict()
+
+
+class TriangleAreaTable(object):
+    """A cumulative triangle area table for area weighted sampling
+
+    Building the table is O(T) and each sample afterwards is a binary
+    search, O(log T), followed by vectorized barycentric interpolation.
+    weights are optional per vertex densities, each triangle's area is
+    scaled by the mean weight of its corners.
+    """
+
+    def __init__(self, positions, normals, triangles, weights=None):
+        self.positions = np.asarray(positions, dtype=np.float64)
+        self.normals = np.asarray(normals, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        corners = self.positions[self.triangles]
+        crosses = np.cross(corners[:, 1] - corners[:, 0],
+                           corners[:, 2] - corners[:, 0])
+        self.areas = 0.5 * np.linalg.norm(crosses, axis=1)
+        if weights is not None:
+            weights = np.clip(np.asarray(weights, dtype=np.float64), 0.0,
+                              None)
+            self.areas *= weights[self.triangles].mean(axis=1)
+        self.cumulative_areas = np.cumsum(self.areas)
+
+    @property
+    def total_area(self):
+        if not len(self.cumulative_areas):
+            return 0.0
+        return float(self.cumulative_areas[-1])
+
+    def sample(self, count, seed=None, start=0):
+        """Returns positions, normals and triangle ids of count points
+
+        start is the index of the first point within the whole sample,
+        so sampling in chunks gives the same points as one call.
+        """
+        if count <= 0 or self.total_area <= 0.0:
+            return (np.empty((0, 3)), np.empty((0, 3)),
+                    np.empty(0, dtype=np.int64))
+        values = random_streams.block_uniform(
+            seed, random_streams.SURFACE, start, start + count, 3)
+        targets = values[:, 0] * self.total_area
+        triangle_ids = np.searchsorted(self.cumulative_areas, targets,
+                                       side="right")
+        np.minimum(triangle_ids, len(self.areas) - 1, out=triangle_ids)
+        weights = barycentric_weights(values[:, 1], values[:, 2])
+        corners = self.triangles[triangle_ids]
+        positions = np.einsum("nk,nkj->nj", weights, self.positions[corners])
+        normals = np.einsum("nk,nkj->nj", weights, self.normals[corners])
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        normals /= np.where(lengths > 0.0, lengths, 1.0)
+        return positions, normals, triangle_ids
+
+
+def barycentric_weights(first, second):
+    """Returns barycentric weights uniform over a triangle
+
+    first and second are arrays of uniform [0, 1) values, one per point.
+    """
+    root = np.sqrt(first)
+    weights = np.empty((len(root), 3))
+    weights[:, 0] = 1.0 - root
+    weights[:, 1] = root * (1.0 - second)
+    weights[:, 2] = root * second
+    return weights
+
+
+def area_table(source, weights=None):
+    """Returns the cached TriangleAreaTable of a geometry source
+
+    Tables are keyed on the source's cache_key and the weights, so
+    pressing Apply again on an unchanged mesh reuses the table instead
+    of rebuilding it.
+    """
+    key = source.cache_key()
+    if weights is not None:
+        key += (hash(np.asarray(weights).tobytes()),)
+    table = _table_cache.pop(key, None)
+    if table is None:
+        table = TriangleAreaTable(source.positions, source.normals,
+                                  source.triangles, weights)
+    _table_cache[key] = table
+    while len(_table_cache) > CACHE_SIZE:
+        _table_cache.popitem(last=False)
+    return table
+
+
+def clear_cache():
+    """Forgets every cached area table"""
+    _table_cache.clear()
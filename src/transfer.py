@@ -0,0 +1,51 @@
+"""Atomic file copies with progress reporting."""
+import os
+import shutil
+
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def atomic_copy(source, target, progress_callback=None,
+                chunk_size=CHUNK_SIZE):
+    """Copies source to target so target is never seen half written
+
+    The data goes to a temporary file next to target, which is then
+    swapped in with os.replace. progress_callback is called with the
+    bytes copied so far and the total size after every chunk.
+    """
+    source = str(source)
+    target = str(target)
+    folder = os.path.dirname(target)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    partial = target + ".part"
+    total = os.path.getsize(source)
+    copied = 0
+    try:
+        with open(source, "rb") as source_file, \
+                open(partial, "wb") as target_file:
+            while True:
+                chunk = source_file.read(chunk_size)
+                if not chunk:
+                    break
+                target_file.write(chunk)
+                copied += len(chunk)
+                if progress_callback:
+                    progress_callback(copied, total)
+            target_file.flush()
+            os.fsync(target_file.fileno())
+        shutil.copystat(source, partial)
+        os.replace(partial, target)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return target
+
+
+def atomic_move(source, target, progress_callback=None,
+                chunk_size=CHUNK_SIZE):
+    """Copies source to target atomically, then removes source"""
+    atomic_copy(source, target, progress_callback, chunk_size)
+    os.remove(str(source))
+    return str(target)
@@ -0,0 +1,92 @@
+"""A cached index of the highest saved version in each scenes folder."""
+import logging
+import os
+
+import instrument
+import scene_name
+
+log = logging.getLogger(__name__)
+
+
+class VersionIndex(object):
+    """Maps (descriptor, task, ext) to the max version in a folder
+
+    A folder is scanned once with os.scandir and rescanned only when its
+    modification time changes. A save changes it too, so savers check
+    is_current before writing and pass that to record, which then stores
+    the new modification time instead of rescanning.
+    """
+
+    def __init__(self):
+        self._folders = {}
+        self.skipped = {}
+
+    def _stat(self, folder):
+        try:
+            return os.stat(folder).st_mtime_ns
+        except OSError:
+            return None
+
+    def _versions(self, folder):
+        folder = os.path.abspath(str(folder))
+        mtime = self._stat(folder)
+        cached = self._folders.get(folder)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        versions = self._scan(folder) if mtime is not None else {}
+        self._folders[folder] = (mtime, versions)
+        return versions
+
+    def _scan(self, folder):
+        with instrument.span("version_index.scan", folder=folder) as span:
+            names = [entry.name for entry in os.scandir(folder)
+                     if entry.is_file()]
+            span.set(files=len(names))
+        instrument.count("version_index.scans")
+        versions, skipped = scene_name.scan_versions(names)
+        self.skipped[folder] = skipped
+        if skipped:
+            log.debug("Skipped %d non scene files in %s", skipped, folder)
+        return versions
+
+    def is_current(self, folder):
+        """Returns whether the cached versions of folder are up to date"""
+        cached = self._folders.get(os.path.abspath(str(folder)))
+        return cached is not None and cached[0] == self._stat(folder)
+
+    def max_version(self, folder, descriptor, task, ext):
+        """Returns the highest saved version, 0 if there is none"""
+        return self._versions(folder).get((descriptor, task, ext), 0)
+
+    def next_version(self, folder, descriptor, task, ext):
+        """Returns the version the next increment should be saved as"""
+        return self.max_version(folder, descriptor, task, ext) + 1
+
+    def record(self, folder, descriptor, task, ext, ver, was_current=False):
+        """Notes a version that was just saved
+
+        was_current is what is_current returned before the save. When the
+        cache was up to date then, the save is the only change to the
+        folder, so the version is added without rescanning. Anything that
+        writes to the folder as part of the save must be done before this
+        is called, as the folder's modification time is stored here.
+        """
+        folder = os.path.abspath(str(folder))
+        cached = self._folders.get(folder)
+        if was_current and cached is not None:
+            versions = cached[1]
+        else:
+            versions = self._versions(folder)
+        key = (descriptor, task, ext)
+        versions[key] = max(versions.get(key, 0), ver)
+        self._folders[folder] = (self._stat(folder), versions)
+
+    def invalidate(self, folder=None):
+        """Forgets one folder, or every folder when none is given"""
+        if folder is None:
+            self._folders.clear()
+        else:
+            self._folders.pop(os.path.abspath(str(folder)), None)
+
+
+INDEX = VersionIndex()
@@ -0,0 +1,120 @@
+"""Per vertex weights that make a scatter denser in some places.
+
+Every weight is computed for all vertices in one vectorized pass and
+ends up in [0, 1], 0 meaning nothing is scattered there.
+"""
+import itertools
+
+import numpy as np
+
+import random_streams
+
+NO_WEIGHTS = "None"
+COLOR = "Vertex Color"
+SLOPE = "Slope"
+HEIGHT = "Height"
+NOISE = "Noise"
+KINDS = (NO_WEIGHTS, COLOR, SLOPE, HEIGHT, NOISE)
+
+NOISE_TABLE_SIZE = 256
+
+
+def ramp(values, low, high):
+    """Maps values linearly from low..high onto 0..1, clamped"""
+    if high == low:
+        return (values >= high).astype(np.float64)
+    return np.clip((values - low) / float(high - low), 0.0, 1.0)
+
+
+def color_weights(colors):
+    """Returns the luminance of (n, 4) RGBA vertex colors"""
+    return colors[:, :3].dot((0.2126, 0.7152, 0.0722))
+
+
+def slope_angles(normals, up=(0.0, 1.0, 0.0)):
+    """Returns the angle in degrees between each normal and up"""
+    up = np.asarray(up, dtype=np.float64)
+    lengths = np.linalg.norm(normals, axis=1) * np.linalg.norm(up)
+    cosines = normals.dot(up) / np.where(lengths > 0.0, lengths, 1.0)
+    return np.degrees(np.arccos(np.clip(cosines, -1.0, 1.0)))
+
+
+def value_noise(positions, frequency=0.1, seed=None):
+    """Returns smooth 3d value noise in [0, 1) at each position
+
+    Lattice values come from the seed's NOISE stream and are blended
+    with a smoothstep between the eight corners of each cell.
+    """
+    rng = random_streams.stream(seed, random_streams.NOISE)
+    lattice = rng.random(NOISE_TABLE_SIZE)
+    permutation = rng.permutation(NOISE_TABLE_SIZE)
+    mask = NOISE_TABLE_SIZE - 1
+    scaled = np.asarray(positions, dtype=np.float64) * frequency
+    cells = np.floor(scaled).astype(np.int64)
+    fractions = scaled - cells
+    fades = fractions * fractions * (3.0 - 2.0 * fractions)
+    noise = np.zeros(len(scaled))
+    for corner in itertools.product((0, 1), repeat=3):
+        ids = (cells + corner) & mask
+        hashed = permutation[(permutation[(permutation[ids[:, 0]] +
+                                           ids[:, 1]) & mask] +
+                              ids[:, 2]) & mask]
+        blend = np.where(corner, fades, 1.0 - fades).prod(axis=1)
+        noise += blend * lattice[hashed]
+    return noise
+
+
+class WeightMap(object):
+    """Describes how to weight the vertices of a geometry source
+
+    The raw value of each kind (color luminance, slope angle in degrees,
+    height or noise) is ramped from low to high onto 0 to 1. Slope is
+    the other way around, so flat ground is weighted 1 and everything
+    steeper than high is 0. invert flips the final weights.
+    """
+
+    def __init__(self, kind, low=0.0, high=1.0, frequency=0.1,
+                 invert=False, axis=1):
+        if kind not in KINDS:
+            raise ValueError("Unknown weight map '{}'".format(kind))
+        self.kind = kind
+        self.low = low
+        self.high = high
+        self.frequency = frequency
+        self.invert = invert
+        self.axis = axis
+
+    def to_dict(self):
+        return {"kind": self.kind, "low": self.low, "high": self.high,
+                "frequency": self.frequency, "invert": self.invert,
+                "axis": self.axis}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def key(self):
+        """Returns a tuple that changes whenever the weights would"""
+        return (self.kind, self.low, self.high, self.frequency, self.invert,
+                self.axis)
+
+    def evaluate(self, source, seed=None):
+        """Returns the (n,) weights of every vertex of source"""
+        if self.kind == NO_WEIGHTS:
+            weights = np.ones(len(source))
+        elif self.kind == COLOR:
+            if source.colors is None:
+                raise ValueError("The destination has no vertex colors")
+            weights = ramp(color_weights(source.colors), self.low, self.high)
+        elif self.kind == SLOPE:
+            weights = 1.0 - ramp(slope_angles(source.normals), self.low,
+                                 self.high)
+        elif self.kind == HEIGHT:
+            weights = ramp(source.positions[:, self.axis], self.low,
+                           self.high)
+        else:
+            weights = ramp(value_noise(source.positions, self.frequency,
+                                       seed), self.low, self.high)
+        if self.invert:
+            weights = 1.0 - weights
+        return weights
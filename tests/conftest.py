@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules live flat in src, the way Maya's script path loads them
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
@@ -0,0 +1,64 @@
+"""Archiving old scene versions and restoring them."""
+import gzip
+import os
+
+import pytest
+
+import archive
+import scene_history
+import smartsave_batch
+
+
+def _versions(folder, vers, name="rock_model_v{:03d}.ma"):
+    for ver in vers:
+        path = folder / name.format(ver)
+        path.write_bytes("version {}\n".format(ver).encode() * 100)
+
+
+def test_archives_all_but_the_newest(tmp_path):
+    _versions(tmp_path, range(1, 6))
+    archived = archive.archive_folder(tmp_path, keep=2)
+    assert sorted(os.path.basename(path) for path in archived) == [
+        "rock_model_v00{}.ma.gz".format(ver) for ver in (1, 2, 3)]
+    assert sorted(path.name for path in tmp_path.glob("*.ma")) == [
+        "rock_model_v004.ma", "rock_model_v005.ma"]
+    with gzip.open(archived[0]) as archived_file:
+        assert archived_file.read().startswith(b"version ")
+    history = scene_history.SceneHistory(tmp_path)
+    assert sorted(history.entries) == ["rock_model_v004.ma",
+                                       "rock_model_v005.ma"]
+
+
+def test_restore_round_trip(tmp_path):
+    _versions(tmp_path, range(1, 4))
+    original = (tmp_path / "rock_model_v001.ma").read_bytes()
+    archive.archive_folder(tmp_path, keep=1)
+    restored = archive.restore_version(tmp_path, "rock", "model", 1)
+    with open(restored, "rb") as restored_file:
+        assert restored_file.read() == original
+    assert "rock_model_v001.ma" in scene_history.SceneHistory(
+        tmp_path).entries
+    with pytest.raises(FileExistsError):
+        archive.restore_version(tmp_path, "rock", "model", 1)
+
+
+@pytest.mark.parametrize("keep", [0, -1])
+def test_at_least_one_version_is_kept(tmp_path, keep):
+    _versions(tmp_path, range(1, 3))
+    with pytest.raises(ValueError):
+        archive.archive_folder(tmp_path, keep=keep)
+    with pytest.raises(SystemExit):
+        smartsave_batch.main(["archive", str(tmp_path), "--keep",
+                              str(keep)])
+    assert len(list(tmp_path.glob("*.ma"))) == 2
+
+
+def test_existing_archives_are_not_replaced(tmp_path):
+    _versions(tmp_path, range(1, 3))
+    archive.archive_folder(tmp_path, keep=1)
+    archived = tmp_path / archive.ARCHIVE_FOLDER / "rock_model_v001.ma.gz"
+    before = archived.read_bytes()
+    (tmp_path / "rock_model_v001.ma").write_bytes(b"NEW")
+    assert archive.archive_folder(tmp_path, keep=1) == []
+    assert archived.read_bytes() == before
+    assert (tmp_path / "rock_model_v001.ma").read_bytes() == b"NEW"
@@ -0,0 +1,81 @@
+"""Writing and memory-mapped reading of scatter point caches."""
+import numpy as np
+import pytest
+
+import point_cache
+import scatter_engine
+
+
+def _transforms(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return scatter_engine.ScatterTransforms(
+        rng.random((count, 3)) * 100, rng.random((count, 3)) * 360,
+        rng.random((count, 3)) + 1)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / ("rocks" + point_cache.EXTENSION))
+    transforms = _transforms(1000)
+    ids = np.arange(1000) * 7
+    source_ids = np.arange(1000) % 2
+    point_cache.write(path, transforms, ids=ids, sources=["rock", "tree"],
+                      source_ids=source_ids, seed=42,
+                      settings={"percent": 10})
+    with point_cache.PointCache(path) as cache:
+        assert len(cache) == 1000
+        assert cache.sources == ["rock", "tree"]
+        assert cache.seed == 42
+        assert cache.settings == {"percent": 10}
+        np.testing.assert_array_equal(cache.column("ids"), ids)
+        np.testing.assert_array_equal(cache.column("source_ids"), source_ids)
+        for name in point_cache.TRANSFORM_COLUMNS:
+            column = cache.column(name)
+            assert column.dtype == np.float32
+            np.testing.assert_array_equal(
+                column, getattr(transforms, name).astype(np.float32))
+
+
+def test_columns_are_aligned_views(tmp_path):
+    path = str(tmp_path / ("rocks" + point_cache.EXTENSION))
+    point_cache.write(path, _transforms(333))
+    header, data_start = point_cache.read_header(path)
+    assert data_start % point_cache.ALIGNMENT == 0
+    for info in header["columns"].values():
+        assert info["offset"] % point_cache.ALIGNMENT == 0
+    with point_cache.PointCache(path) as cache:
+        column = cache.column("translate")
+        assert not column.flags.owndata
+        assert not column.flags.writeable
+
+
+def test_range_reads(tmp_path):
+    path = str(tmp_path / ("rocks" + point_cache.EXTENSION))
+    transforms = _transforms(10000)
+    point_cache.write(path, transforms, dtype=np.float64)
+    with point_cache.PointCache(path) as cache:
+        part = cache.transforms(2500, 2600)
+        assert len(part) == 100
+        np.testing.assert_array_equal(part.rotate, transforms.rotate[2500:2600])
+        np.testing.assert_array_equal(cache.column("ids", -3),
+                                      [9997, 9998, 9999])
+        assert len(cache.column("scale", 50, 10)) == 0
+        chunks = list(cache.iter_chunks(3000))
+        assert [start for start, _ in chunks] == [0, 3000, 6000, 9000]
+        np.testing.assert_array_equal(
+            np.concatenate([chunk.translate for _, chunk in chunks]),
+            transforms.translate)
+
+
+def test_empty_cache(tmp_path):
+    path = str(tmp_path / ("empty" + point_cache.EXTENSION))
+    point_cache.write(path, _transforms(0))
+    with point_cache.PointCache(path) as cache:
+        assert len(cache) == 0
+        assert cache.transforms().translate.shape == (0, 3)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "scene.ma"
+    path.write_text(u"//Maya ASCII scene\n")
+    with pytest.raises(ValueError):
+        point_cache.PointCache(str(path))
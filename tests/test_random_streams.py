@@ -0,0 +1,74 @@
+"""Chunked and multi-process scatters must match the serial run exactly."""
+import numpy as np
+
+import batch_scatter
+import geometry
+import placement
+import random_streams
+import scatter_engine
+
+SEED = 1234
+
+
+def test_block_uniform_is_the_same_in_any_chunking():
+    whole = random_streams.block_uniform(SEED, random_streams.ROTATE, 0,
+                                         10000, 3)
+    bounds = [0, 1, 4095, 4096, 4097, 7000, 10000]
+    parts = [random_streams.block_uniform(SEED, random_streams.ROTATE,
+                                          start, stop, 3)
+             for start, stop in zip(bounds, bounds[1:])]
+    np.testing.assert_array_equal(np.concatenate(parts), whole)
+
+
+def test_indexed_uniform_matches_block_uniform():
+    whole = random_streams.block_uniform(SEED, random_streams.SCALE, 0,
+                                         20000, 3)
+    rng = np.random.default_rng(0)
+    for ids in (np.arange(5000, 9000), np.sort(rng.choice(20000, 300)),
+                rng.permutation(20000)[:500], np.array([], dtype=np.int64)):
+        np.testing.assert_array_equal(
+            random_streams.indexed_uniform(SEED, random_streams.SCALE, ids, 3),
+            whole[ids])
+
+
+def test_streams_of_different_purposes_differ():
+    rotate = random_streams.block_uniform(SEED, random_streams.ROTATE, 0, 10)
+    scale = random_streams.block_uniform(SEED, random_streams.SCALE, 0, 10)
+    assert not np.array_equal(rotate, scale)
+
+
+def test_chunked_compute_transforms_matches_one_call():
+    positions = np.random.default_rng(1).random((9000, 3))
+    ranges = dict(rotate_max=(0, 360, 45), scale_min=(1, 1, 1),
+                  scale_max=(2, 3, 2), seed=SEED)
+    whole = scatter_engine.compute_transforms(positions, **ranges)
+    for name in ("translate", "rotate", "scale"):
+        parts = [getattr(scatter_engine.compute_transforms(
+                     positions[start:start + 1000], start=start, **ranges),
+                     name)
+                 for start in range(0, len(positions), 1000)]
+        np.testing.assert_array_equal(np.concatenate(parts),
+                                      getattr(whole, name))
+
+
+def test_batch_in_a_process_pool_matches_serial():
+    settings = [placement.ScatterSettings(percent=40, rotate_max=(0, 360, 0),
+                                          scale_max=(2, 2, 2), seed=seed)
+                for seed in (1, 2, 3)]
+    settings.append(placement.ScatterSettings(
+        mode=placement.SURFACE_MODE, surface_points=2000, min_distance=0.5,
+        align=True, seed=4))
+
+    def jobs():
+        return [batch_scatter.BatchScatterJob(
+                    "rock", geometry.MockMeshSource.plane(40, 40), options)
+                for options in settings]
+
+    serial = batch_scatter.compute_batch(jobs(), workers=1)
+    pooled = batch_scatter.compute_batch(jobs(), workers=2)
+    for one, other in zip(serial, pooled):
+        np.testing.assert_array_equal(one.placement.ids, other.placement.ids)
+        for name in ("translate", "rotate", "scale"):
+            np.testing.assert_array_equal(
+                getattr(one.placement.transforms, name),
+                getattr(other.placement.transforms, name))
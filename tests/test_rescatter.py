@@ -0,0 +1,108 @@
+"""Updating an existing scatter in place."""
+import os
+
+import numpy as np
+
+import geometry
+import mock_cmds
+import placement
+import rescatter
+import scatter_engine
+import scatter_job
+import scatter_output
+
+SCATTER_NAME = "rock"
+
+
+def _placement(ids, translate):
+    translate = np.asarray(translate, dtype=np.float64)
+    count = len(translate)
+    transforms = scatter_engine.ScatterTransforms(
+        translate, np.zeros((count, 3)), np.ones((count, 3)))
+    return placement.Placement(transforms, None, None, np.asarray(ids))
+
+
+def _scatter(cmds, source, settings, output):
+    """Scatters like the tool does and returns the group and its record"""
+    group = cmds.group(empty=True, name=SCATTER_NAME + "_instance_grp#")
+    new = placement.compute_placement(source, settings)
+    created = scatter_job.ScatterJob(output, SCATTER_NAME, group,
+                                     new.transforms, cmds=cmds).run()
+    record = rescatter.record_scatter(group, SCATTER_NAME, ["plane"],
+                                      output, settings, source, new,
+                                      created, cmds)
+    return group, record
+
+
+def test_diff_is_proportional_to_the_change():
+    old = _placement(np.arange(100), np.zeros((100, 3)))
+    translate = np.zeros((100, 3))
+    translate[[10, 20, 30], 1] = 1.0
+    # Ids 0 and 1 dropped, 100 to 103 new
+    new = _placement(np.arange(2, 104), translate[2:].tolist() +
+                     [[5.0, 0.0, 0.0]] * 4)
+    removed, added, changed = rescatter.diff_placements(old, new)
+    assert removed.tolist() == [0, 1]
+    assert new.ids[added].tolist() == [100, 101, 102, 103]
+    assert new.ids[changed].tolist() == [10, 20, 30]
+
+
+def test_moves_within_tolerance_are_unchanged():
+    old = _placement([3, 1, 2], np.zeros((3, 3)))
+    new = _placement([1, 2, 3], np.full((3, 3), rescatter.TOLERANCE / 2))
+    removed, added, changed = rescatter.diff_placements(old, new)
+    assert len(removed) == len(added) == len(changed) == 0
+
+
+def test_update_touches_only_what_changed():
+    cmds = mock_cmds.RecordingCmds()
+    source = geometry.MockMeshSource.plane(20, 20)
+    settings = placement.ScatterSettings(percent=50, seed=4)
+    output = scatter_output.TransformsOutput(cmds)
+    group, record = _scatter(cmds, source, settings, output)
+    count = len(record.instances)
+    cmds.reset()
+    settings = placement.ScatterSettings(percent=55, seed=4)
+    updater = rescatter.Rescatter(group, record, cmds)
+    record = updater.run(source, settings, output)
+    expected = placement.compute_placement(source, settings)
+    assert sorted(record.instances) == sorted(expected.ids.tolist())
+    assert updater.added > 0
+    assert updater.added + updater.removed + updater.changed < count
+    assert cmds.calls["instance"] == updater.added
+    assert cmds.calls["xform"] == updater.added + updater.changed
+    assert set(cmds.listRelatives(group)) == set(record.instances.values())
+
+
+def test_update_recreates_instances_deleted_by_hand():
+    cmds = mock_cmds.RecordingCmds()
+    source = geometry.MockMeshSource.plane(10, 10)
+    settings = placement.ScatterSettings(percent=40, seed=2)
+    output = scatter_output.TransformsOutput(cmds)
+    group, record = _scatter(cmds, source, settings, output)
+    deleted = sorted(record.instances)[:3]
+    cmds.delete([record.instances[instance_id] for instance_id in deleted])
+    cmds.reset()
+    updater = rescatter.Rescatter(group, record, cmds)
+    record = updater.run(source, settings, output)
+    assert (updater.added, updater.removed, updater.changed) == (3, 0, 0)
+    assert cmds.calls["instance"] == 3
+    assert all(cmds.objExists(node) for node in record.instances.values())
+    assert len(cmds.listRelatives(group)) == len(record.instances)
+
+
+def test_point_cache_is_reapplied_in_place(tmp_path):
+    cmds = mock_cmds.RecordingCmds(workspace_root=str(tmp_path))
+    source = geometry.MockMeshSource.plane(10, 10)
+    settings = placement.ScatterSettings(percent=40, seed=2)
+    output = scatter_output.PointCacheOutput(cmds)
+    group, record = _scatter(cmds, source, settings, output)
+    path = output.cached_path(group)
+    settings = placement.ScatterSettings(percent=60, seed=2)
+    # The mock raises on adding the pointCache attribute a second time
+    record = rescatter.Rescatter(group, record, cmds).run(source, settings,
+                                                          output)
+    assert record.output_name == output.name
+    assert output.cached_path(group) == path
+    assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
+    assert rescatter.ScatterRecord.read(group, cmds).settings.percent == 60
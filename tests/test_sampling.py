@@ -0,0 +1,42 @@
+"""Uniform and weighted vertex sampling."""
+import numpy as np
+import pytest
+
+import sampling
+
+
+@pytest.mark.parametrize("total, count", [(20, 5), (200, 5), (1000, 900)])
+def test_reservoir_sample_is_uniform(total, count):
+    picked = np.zeros(total)
+    runs = 2000
+    for seed in range(runs):
+        sample = sampling.reservoir_sample(iter(range(total)), count, seed)
+        assert len(set(sample)) == count
+        assert sample == sorted(sample)
+        picked[sample] += 1
+    expected = runs * count / float(total)
+    # Well inside the chi-square spread for total - 1 degrees of freedom
+    chi_square = ((picked - expected) ** 2 / expected).sum()
+    assert chi_square < total + 6 * np.sqrt(2 * total)
+
+
+def test_reservoir_sample_of_short_streams():
+    assert sampling.reservoir_sample(iter("abc"), 5, seed=1) == ["a", "b",
+                                                                "c"]
+    assert sampling.reservoir_sample(iter("abc"), 0, seed=1) == []
+    assert (sampling.reservoir_sample(list("abcdef"), 3, seed=2) ==
+            sampling.reservoir_sample(iter("abcdef"), 3, seed=2))
+
+
+def test_sample_indices_grow_by_adding():
+    smaller = sampling.sample_indices(10000, 300, seed=3)
+    larger = sampling.sample_indices(10000, 500, seed=3)
+    assert len(np.intersect1d(smaller, larger)) == 300
+
+
+def test_weighted_indices_skip_zero_weights():
+    weights = np.zeros(1000)
+    weights[::10] = 1.0
+    picked = sampling.weighted_indices(weights, 50, seed=4)
+    assert len(picked) == 50
+    assert (weights[picked] > 0).all()
@@ -0,0 +1,111 @@
+"""Scatter transforms and the matrices they stand for."""
+import numpy as np
+
+import scatter_engine
+
+
+def _axis_matrix(axis, degrees):
+    """Row-vector rotation matrix around one axis"""
+    radians = np.radians(degrees)
+    cos, sin = np.cos(radians), np.sin(radians)
+    first, second = (axis + 1) % 3, (axis + 2) % 3
+    matrix = np.eye(3)
+    matrix[first, first] = matrix[second, second] = cos
+    matrix[first, second] = sin
+    matrix[second, first] = -sin
+    return matrix
+
+
+def _random_angles(count, seed=0):
+    return np.random.default_rng(seed).uniform(-180.0, 180.0, (count, 3))
+
+
+def test_rotation_matrices_use_the_xyz_rotate_order():
+    for x, y, z in _random_angles(20):
+        expected = (_axis_matrix(0, x).dot(_axis_matrix(1, y))
+                    .dot(_axis_matrix(2, z)))
+        np.testing.assert_allclose(
+            scatter_engine.rotation_matrices([[x, y, z]])[0], expected,
+            atol=1e-12)
+
+
+def test_compose_matrices():
+    matrices = scatter_engine.compose_matrices([[1.0, 2.0, 3.0]],
+                                               [[0.0, 90.0, 0.0]],
+                                               [[2.0, 2.0, 2.0]])
+    # A quarter turn around y takes +x to -z, as in Maya
+    point = np.array([1.0, 0.0, 0.0, 1.0]).dot(matrices[0])
+    np.testing.assert_allclose(point, [1.0, 2.0, 1.0, 1.0], atol=1e-12)
+
+
+def test_euler_round_trip():
+    angles = _random_angles(1000)
+    # Keep clear of gimbal lock, where other angles give the same matrix
+    angles[:, 1] = np.clip(angles[:, 1], -89.0, 89.0)
+    matrices = scatter_engine.rotation_matrices(angles)
+    np.testing.assert_allclose(scatter_engine.euler_from_matrices(matrices),
+                               angles, atol=1e-9)
+
+
+def test_euler_at_gimbal_lock_gives_the_same_matrix():
+    angles = np.array([[30.0, 90.0, 10.0], [-50.0, -90.0, 25.0]])
+    matrices = scatter_engine.rotation_matrices(angles)
+    recovered = scatter_engine.euler_from_matrices(matrices)
+    np.testing.assert_allclose(scatter_engine.rotation_matrices(recovered),
+                               matrices, atol=1e-9)
+
+
+def test_compute_transforms_stays_in_range():
+    transforms = scatter_engine.compute_transforms(
+        np.zeros((5000, 3)), rotate_max=(0, 360, 90), scale_min=(1, 2, 3),
+        scale_max=(2, 2, 4), seed=5)
+    assert (transforms.rotate[:, 0] == 0).all()
+    assert (transforms.rotate[:, 1] <= 360).all()
+    assert (transforms.rotate[:, 2] <= 90).all()
+    assert (transforms.scale[:, 1] == 2).all()
+    assert ((transforms.scale[:, 2] >= 3) & (transforms.scale[:, 2] <= 4)).all()
+    again = scatter_engine.compute_transforms(
+        np.zeros((5000, 3)), rotate_max=(0, 360, 90), scale_min=(1, 2, 3),
+        scale_max=(2, 2, 4), seed=5)
+    np.testing.assert_array_equal(transforms.rotate, again.rotate)
+
+
+def _random_normals(count, seed=1):
+    normals = np.random.default_rng(seed).normal(size=(count, 3))
+    return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+
+def test_alignment_turns_aim_onto_the_normal():
+    normals = np.vstack([_random_normals(500), [[0.0, 1.0, 0.0]],
+                         [[0.0, -1.0, 0.0]], [[0.0, 0.0, 0.0]]])
+    matrices = scatter_engine.normal_alignment_matrices(normals)
+    aimed = np.einsum("j,njk->nk", [0.0, 1.0, 0.0], matrices)
+    expected = normals.copy()
+    # Zero length normals leave the instance as it was
+    expected[-1] = [0.0, 1.0, 0.0]
+    np.testing.assert_allclose(aimed, expected, atol=1e-9)
+    np.testing.assert_allclose(np.matmul(matrices,
+                                         np.transpose(matrices, (0, 2, 1))),
+                               np.broadcast_to(np.eye(3), matrices.shape),
+                               atol=1e-9)
+
+
+def test_align_to_normals_keeps_the_random_twist():
+    normals = _random_normals(300)
+    transforms = scatter_engine.compute_transforms(
+        np.zeros((300, 3)), rotate_max=(0, 360, 0), seed=2)
+    aligned = scatter_engine.align_to_normals(transforms, normals)
+    rotations = scatter_engine.rotation_matrices(aligned.rotate)
+    # The instance's up axis follows the normal whatever its twist
+    aimed = np.einsum("j,njk->nk", [0.0, 1.0, 0.0], rotations)
+    np.testing.assert_allclose(aimed, normals, atol=1e-9)
+    # and the twist is the random rotation, applied in local space first
+    np.testing.assert_allclose(
+        rotations,
+        np.matmul(scatter_engine.rotation_matrices(transforms.rotate),
+                  scatter_engine.normal_alignment_matrices(normals)),
+        atol=1e-9)
+    cached = scatter_engine.align_to_normals(
+        transforms, normals,
+        alignment=scatter_engine.normal_alignment_matrices(normals))
+    np.testing.assert_array_equal(cached.rotate, aligned.rotate)
@@ -0,0 +1,86 @@
+"""The per-folder version manifest and its journal."""
+import json
+import os
+
+import pytest
+
+import scene_history
+
+
+def _save(folder, name, contents="scene"):
+    with open(os.path.join(str(folder), name), "w") as scene:
+        scene.write(contents)
+    return scene_history.SceneHistory(folder).record(name)
+
+
+def test_first_save_builds_the_manifest(tmp_path):
+    (tmp_path / "rock_model_v001.ma").write_text(u"old")
+    _save(tmp_path, "rock_model_v002.ma")
+    with open(str(tmp_path / scene_history.MANIFEST_NAME)) as manifest:
+        data = json.load(manifest)
+    assert sorted(data["files"]) == ["rock_model_v001.ma",
+                                     "rock_model_v002.ma"]
+    assert data["latest"] == {"rock|model|.ma": 2}
+
+
+def test_journal_is_folded_into_the_manifest(tmp_path, monkeypatch):
+    monkeypatch.setattr(scene_history, "COMPACT_SIZE", 1024)
+    for ver in range(1, 200):
+        _save(tmp_path, "rock_model_v{:03d}.ma".format(ver))
+    journal = tmp_path / scene_history.JOURNAL_NAME
+    assert not journal.exists() or journal.stat().st_size < 1024
+    history = scene_history.SceneHistory(tmp_path)
+    assert len(history.entries) == 199
+    assert history.latest("rock", "model").ver == 199
+
+
+def test_latest_per_asset_reads_the_journal(tmp_path):
+    for ver in (1, 2, 3):
+        _save(tmp_path, "rock_model_v{:03d}.ma".format(ver))
+    _save(tmp_path, "tree_rig_v007.mb")
+    folder = os.path.abspath(str(tmp_path))
+    assert scene_history.latest_per_asset([tmp_path]) == {
+        (folder, "rock", "model", ".ma"): 3,
+        (folder, "tree", "rig", ".mb"): 7}
+
+
+def test_latest_per_asset_scans_folders_without_a_manifest(tmp_path):
+    (tmp_path / "rock_model_v004.ma").write_text(u"scene")
+    latest = scene_history.latest_per_asset([tmp_path])
+    assert latest == {(os.path.abspath(str(tmp_path)), "rock", "model",
+                       ".ma"): 4}
+    assert (tmp_path / scene_history.MANIFEST_NAME).exists()
+
+
+def test_forgetting_the_latest_version(tmp_path):
+    for ver in (1, 2, 3):
+        _save(tmp_path, "rock_model_v{:03d}.ma".format(ver))
+    history = scene_history.SceneHistory(tmp_path)
+    history.forget("rock_model_v003.ma")
+    assert history.latest_versions == {"rock|model|.ma": 2}
+    history.forget("rock_model_v002.ma")
+    history.forget("rock_model_v001.ma")
+    assert scene_history.SceneHistory(tmp_path).latest_versions == {}
+
+
+def test_names_that_are_not_scenes(tmp_path):
+    _save(tmp_path, "rock_model_v001.ma")
+    history = scene_history.SceneHistory(tmp_path)
+    with pytest.raises(ValueError):
+        history.forget("notes.txt")
+    with pytest.raises(ValueError):
+        history.record("notes.txt")
+    # A bad line written by an older version is skipped when read
+    with open(history.journal_path, "a") as journal:
+        journal.write(json.dumps({"file": "notes.txt", "entry": None}) + "\n")
+        journal.write('{"file": "rock_mod')
+    assert list(scene_history.SceneHistory(tmp_path).entries) == [
+        "rock_model_v001.ma"]
+
+
+def test_stale_lock_is_broken(tmp_path, monkeypatch):
+    monkeypatch.setattr(scene_history, "STALE_LOCK_AGE", 0.0)
+    (tmp_path / scene_history.LOCK_NAME).write_text(u"")
+    os.utime(str(tmp_path / scene_history.LOCK_NAME), (0, 0))
+    _save(tmp_path, "rock_model_v001.ma")
+    assert not (tmp_path / scene_history.LOCK_NAME).exists()
@@ -0,0 +1,38 @@
+"""Scene file name parsing and version scanning."""
+import pytest
+
+import scene_name
+
+
+def test_parse():
+    assert scene_name.parse("rock_model_v012.ma") == ("rock", "model", 12,
+                                                      ".ma")
+
+
+def test_versions_compare_numerically_past_999():
+    versions, skipped = scene_name.scan_versions(
+        ["rock_model_v999.ma", "rock_model_v1000.ma", "rock_model_v998.ma"])
+    assert versions == {("rock", "model", ".ma"): 1000}
+    assert skipped == 0
+
+
+@pytest.mark.parametrize("name", [
+    "rock_model.ma", "rock_model_v.ma", "rock_model_vabc.ma",
+    "rock_model_v001", "rock_lookdev_model_v001.ma", "notes.txt",
+    ".smartsave_manifest.json", "rock_model_v001.ma.part",
+])
+def test_non_conforming_names_are_skipped(name):
+    assert scene_name.parse(name) is None
+    assert scene_name.scan_versions([name, "rock_model_v002.ma"]) == (
+        {("rock", "model", ".ma"): 2}, 1)
+
+
+def test_stored_manifest_parses_as_its_scene():
+    assert scene_name.parse("rock_model_v005.ma" +
+                            scene_name.STORED_SUFFIX) == (
+        "rock", "model", 5, ".ma")
+
+
+def test_parse_or_raise():
+    with pytest.raises(ValueError):
+        scene_name.parse_or_raise("rock.ma")